@@ -0,0 +1,316 @@
+"""
+Benchmark harness for degrees.
+
+Generates a synthetic dataset with power-law cast sizes and person
+popularity (or uses an existing data directory), then for each way of
+loading the data times load_data, neighbors_for_person and every search
+engine on the same random queries. Each load mode, and each engine
+within it, runs in a fresh process so its peak memory can be measured
+on its own, and the results are written as JSON for diffing between
+versions.
+
+Usage: python benchmark.py [--directory DIR] [--people N] [--movies N]
+                           [--queries N] [--sources N] [--output FILE]
+"""
+import argparse
+import csv
+import itertools
+import json
+import os
+import platform
+import random
+import resource
+import subprocess
+import sys
+import tempfile
+import time
+
+# Load modes: load_data keyword arguments and the engines they support
+MODES = {
+    "dict": ({}, ["bfs", "bidirectional"]),
+    "compact": ({"compact": True, "use_snapshot": False},
+                ["bfs", "bidirectional", "tree", "landmarks"]),
+    "snapshot": ({"compact": True},
+                 ["bfs", "bidirectional", "tree", "landmarks"]),
+}
+
+FIRST_NAMES = ["Ada", "Ben", "Cara", "Dev", "Eli", "Fay", "Gus", "Hana",
+               "Ivo", "June", "Kai", "Lena", "Max", "Nia", "Otto", "Pia"]
+LAST_NAMES = ["Abbott", "Bishop", "Castro", "Dunn", "Ellis", "Ford",
+              "Grant", "Hale", "Ives", "Jones", "Kerr", "Lowe", "Moss",
+              "Nash", "Owen", "Price", "Quinn", "Reed", "Shaw", "Todd"]
+
+
+def generate(directory, people=100000, movies=50000, cast_exponent=2.0,
+             popularity_exponent=1.5, min_cast=4, max_cast=60, seed=0):
+    """
+    Writes people.csv, movies.csv and stars.csv with power-law cast sizes
+    and a power-law chance for each person to be cast, so a few prolific
+    actors star in many movies.
+    """
+    rng = random.Random(seed)
+    os.makedirs(directory, exist_ok=True)
+
+    with open(os.path.join(directory, "people.csv"), "w", newline="",
+              encoding="utf-8") as f:
+        writer = csv.writer(f, quoting=csv.QUOTE_NONNUMERIC)
+        writer.writerow(["id", "name", "birth"])
+        for person_id in range(1, people + 1):
+            first, last = rng.choice(FIRST_NAMES), rng.choice(LAST_NAMES)
+            name = f"{first} {last} {person_id % 997}"
+            birth = rng.randint(1900, 2010) if rng.random() < 0.8 else ""
+            writer.writerow([person_id, name, birth])
+
+    with open(os.path.join(directory, "movies.csv"), "w", newline="",
+              encoding="utf-8") as f:
+        writer = csv.writer(f, quoting=csv.QUOTE_NONNUMERIC)
+        writer.writerow(["id", "title", "year"])
+        for movie_id in range(1, movies + 1):
+            writer.writerow([movie_id, f"Movie {movie_id}",
+                             rng.randint(1920, 2023)])
+
+    popularity = [rng.paretovariate(popularity_exponent) for _ in range(people)]
+    cumulative = list(itertools.accumulate(popularity))
+    population = range(1, people + 1)
+    with open(os.path.join(directory, "stars.csv"), "w", newline="",
+              encoding="utf-8") as f:
+        writer = csv.writer(f)
+        writer.writerow(["person_id", "movie_id"])
+        for movie_id in range(1, movies + 1):
+            size = min(max_cast,
+                       int(min_cast * rng.paretovariate(cast_exponent)))
+            cast = set(rng.choices(population, cum_weights=cumulative, k=size))
+            for person_id in sorted(cast):
+                writer.writerow([person_id, movie_id])
+
+
+def percentiles(samples):
+    """
+    Summarizes latencies in seconds as count, mean and percentiles.
+    """
+    samples = sorted(samples)
+    if not samples:
+        return {"count": 0}
+
+    def at(fraction):
+        return samples[min(len(samples) - 1, int(fraction * len(samples)))]
+
+    return {
+        "count": len(samples),
+        "mean": sum(samples) / len(samples),
+        "p50": at(0.50),
+        "p90": at(0.90),
+        "p99": at(0.99),
+        "max": samples[-1],
+    }
+
+
+def run_mode(mode, directory, queries, sources, seed, only=None):
+    """
+    Loads directory in one mode and times it, returning the results.
+    Queries run from a pool of `sources` people to random targets, on
+    every engine the mode supports or only those listed in `only`.
+    Meant to run in a fresh process, so peak RSS covers only this mode
+    and these engines. A landmark index must already have been built.
+    """
+    import degrees
+
+    options, engines = MODES[mode]
+    if only is not None:
+        engines = [engine for engine in engines if engine in only]
+    results = {"mode": mode}
+
+    start = time.perf_counter()
+    degrees.load_data(directory, **options)
+    results["load_seconds"] = time.perf_counter() - start
+
+    rng = random.Random(seed)
+    person_ids = sorted(degrees.people)
+    pool = rng.sample(person_ids, min(sources, len(person_ids)))
+    pairs = [(rng.choice(pool), rng.choice(person_ids))
+             for _ in range(queries)]
+
+    samples = []
+    for person_id in person_ids[:1000]:
+        start = time.perf_counter()
+        for _ in degrees.neighbors_for_person(person_id):
+            pass
+        samples.append(time.perf_counter() - start)
+    results["neighbors_for_person"] = percentiles(samples)
+
+    if "landmarks" in engines and degrees.landmark_index is None:
+        raise RuntimeError("no landmark index; run build_landmarks first")
+
+    results["engines"] = {}
+    for engine in engines:
+        search = degrees.ENGINES[engine]
+        degrees.source_trees.clear()
+        samples = []
+        degrees_found = []
+        for source, target in pairs:
+            start = time.perf_counter()
+            path = search(source, target)
+            samples.append(time.perf_counter() - start)
+            degrees_found.append(None if path is None else len(path))
+        results["engines"][engine] = percentiles(samples)
+        results["engines"][engine]["degrees"] = degrees_found
+
+    usage = resource.getrusage(resource.RUSAGE_SELF)
+    scale = 1 if sys.platform == "darwin" else 1024
+    results["peak_rss_bytes"] = usage.ru_maxrss * scale
+    return results
+
+
+def build_landmarks(directory):
+    """
+    Builds and saves the landmark index for directory unless an up to
+    date one exists, so that searches in every mode load the same index.
+    Meant to run in its own process, keeping the build out of the memory
+    measured for the landmarks engine.
+
+    Returns the build time in seconds, or None if nothing was built, and
+    the size of the index file in bytes.
+    """
+    import degrees
+    import landmarks
+    import snapshot
+
+    degrees.load_data(directory, compact=True, use_snapshot=False)
+    path = landmarks.index_path(directory)
+    build_seconds = None
+    if degrees.landmark_index is None:
+        start = time.perf_counter()
+        index = landmarks.LandmarkIndex.build(degrees.graph)
+        build_seconds = time.perf_counter() - start
+        index.save(path, snapshot.fingerprint(directory))
+    return {"build_seconds": build_seconds, "bytes": os.path.getsize(path)}
+
+
+def run_child(mode, directory, queries, engines, args):
+    """
+    Runs run_mode in a fresh Python process, returning its results.
+    """
+    child = subprocess.run(
+        [sys.executable, os.path.abspath(__file__), "--child", mode,
+         "--directory", directory, "--queries", str(queries),
+         "--sources", str(args.sources), "--seed", str(args.seed),
+         "--engines", *engines],
+        cwd=os.path.dirname(os.path.abspath(__file__)),
+        stdout=subprocess.PIPE, check=True
+    )
+    return json.loads(child.stdout)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark degrees.")
+    parser.add_argument("--directory",
+                        help="existing data directory; generated if omitted")
+    parser.add_argument("--people", type=int, default=50000)
+    parser.add_argument("--movies", type=int, default=25000)
+    parser.add_argument("--cast-exponent", type=float, default=2.0)
+    parser.add_argument("--popularity-exponent", type=float, default=1.5)
+    parser.add_argument("--min-cast", type=int, default=4)
+    parser.add_argument("--max-cast", type=int, default=60)
+    parser.add_argument("--queries", type=int, default=100)
+    parser.add_argument("--sources", type=int, default=8,
+                        help="number of distinct query sources")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--modes", nargs="+", choices=list(MODES),
+                        default=list(MODES))
+    parser.add_argument("--engines", nargs="*",
+                        default=["bfs", "bidirectional", "tree", "landmarks"],
+                        help="engines to time where the mode supports them")
+    parser.add_argument("--output", help="write JSON results to this file")
+    parser.add_argument("--child", choices=list(MODES), help=argparse.SUPPRESS)
+    parser.add_argument("--build-landmarks", action="store_true",
+                        help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.build_landmarks:
+        json.dump(build_landmarks(args.directory), sys.stdout)
+        return
+    if args.child:
+        results = run_mode(args.child, args.directory, args.queries,
+                           args.sources, args.seed, args.engines)
+        json.dump(results, sys.stdout)
+        return
+
+    with tempfile.TemporaryDirectory() as scratch:
+        directory = args.directory
+        dataset = {"directory": directory}
+        if directory is None:
+            directory = scratch
+            dataset = {
+                "people": args.people,
+                "movies": args.movies,
+                "cast_exponent": args.cast_exponent,
+                "popularity_exponent": args.popularity_exponent,
+                "min_cast": args.min_cast,
+                "max_cast": args.max_cast,
+                "seed": args.seed,
+            }
+            print("Generating data...", file=sys.stderr)
+            generate(directory, args.people, args.movies, args.cast_exponent,
+                     args.popularity_exponent, args.min_cast, args.max_cast,
+                     args.seed)
+
+        report = {
+            "python": platform.python_version(),
+            "dataset": dataset,
+            "queries": args.queries,
+            "sources": args.sources,
+            "modes": {},
+        }
+        if "landmarks" in args.engines and any(
+            "landmarks" in MODES[mode][1] for mode in args.modes
+        ):
+            print("Building landmark index...", file=sys.stderr)
+            child = subprocess.run(
+                [sys.executable, os.path.abspath(__file__),
+                 "--build-landmarks", "--directory", directory],
+                cwd=os.path.dirname(os.path.abspath(__file__)),
+                stdout=subprocess.PIPE, check=True
+            )
+            report["landmarks"] = json.loads(child.stdout)
+        for mode in args.modes:
+            print(f"Benchmarking {mode}...", file=sys.stderr)
+            if mode == "snapshot":
+                # A first load writes the snapshot, later ones map it
+                cold = run_child(mode, directory, 0, [], args)
+
+            # Loading alone gives the baseline peak for the engines below
+            results = run_child(mode, directory, args.queries, [], args)
+            if mode == "snapshot":
+                results["cold_load_seconds"] = cold["load_seconds"]
+            for engine in MODES[mode][1]:
+                if engine not in args.engines:
+                    continue
+                child = run_child(mode, directory, args.queries, [engine],
+                                  args)
+                stats = child["engines"][engine]
+                stats["peak_rss_bytes"] = child["peak_rss_bytes"]
+                stats["extra_rss_bytes"] = (child["peak_rss_bytes"]
+                                            - results["peak_rss_bytes"])
+                results["engines"][engine] = stats
+            report["modes"][mode] = results
+
+    for mode, results in report["modes"].items():
+        print(f"{mode}: load {results['load_seconds']:.2f}s, "
+              f"peak {results['peak_rss_bytes'] / 2 ** 20:.0f} MiB",
+              file=sys.stderr)
+        for engine, stats in results["engines"].items():
+            print(f"  {engine}: p50 {stats['p50'] * 1e3:.2f}ms, "
+                  f"p99 {stats['p99'] * 1e3:.2f}ms, "
+                  f"peak {stats['peak_rss_bytes'] / 2 ** 20:.0f} MiB",
+                  file=sys.stderr)
+
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(report, f, indent=2)
+    else:
+        json.dump(report, sys.stdout, indent=2)
+        print()
+
+
+if __name__ == "__main__":
+    main()
@@ -1,7 +1,20 @@
+import argparse
 import csv
+import itertools
+import json
+import multiprocessing
+import os
 import sys
+import time
+from collections import OrderedDict
 
-from util import Node, StackFrontier, QueueFrontier
+import ingest
+import landmarks
+import snapshot
+from filters import MovieFilter
+from graph import SourceTree
+from nameindex import NameIndex
+from util import Node, IndexedQueueFrontier
 
 # Maps names to a set of corresponding person_ids
 names = {}
@@ -12,10 +25,62 @@ people = {}
 # Maps movie_ids to a dictionary of: title, year, stars (a set of person_ids)
 movies = {}
 
+# Integer-indexed StarGraph, set when data is loaded with compact=True.
+# People and movies are then read-only mappings of name/birth and
+# title/year metadata, fetched from disk when looked up.
+graph = None
 
-def load_data(directory):
+# LandmarkIndex built by landmarks.py, loaded with the compact graph if present
+landmark_index = None
+
+# NameIndex over names, rebuilt by every load_data
+name_index = None
+
+# Most recently used SourceTrees keyed by source person_id, oldest first
+source_trees = OrderedDict()
+SOURCE_TREE_CACHE_SIZE = 8
+
+# MovieFilter for batch queries, set before batch workers fork
+batch_filter = None
+
+
+def load_data(directory, compact=False, use_snapshot=True):
     """
     Load data from CSV files into memory.
+
+    With compact=True the data is loaded as a StarGraph. Unless
+    use_snapshot is False, a binary snapshot is then written next to the
+    CSV files, and later loads map it instead of parsing the CSV files.
+    """
+    global graph, landmark_index, name_index, people, movies
+
+    # Start from nothing, so no data from an earlier load is left behind
+    names.clear()
+    people, movies = {}, {}
+    graph = landmark_index = None
+    source_trees.clear()
+    if compact:
+        if not (use_snapshot and load_snapshot(directory)):
+            load_compact(directory)
+            if use_snapshot:
+                try:
+                    snapshot.save(directory, graph, people, movies)
+                except OSError as e:
+                    print(f"Could not write snapshot: {e}", file=sys.stderr)
+                else:
+                    load_snapshot(directory)
+        landmark_index = landmarks.LandmarkIndex.load(
+            landmarks.index_path(directory), snapshot.fingerprint(directory)
+        )
+    else:
+        load_csv(directory)
+    name_index = NameIndex(names, movie_count)
+
+
+def load_csv(directory):
+    """
+    Load data from CSV files into the people, movies and names
+    dictionaries.
     """
     # Load people
     with open(f"{directory}/people.csv", encoding="utf-8") as f:
@@ -52,85 +117,640 @@ def load_data(directory):
                 pass
 
 
+def load_compact(directory):
+    """
+    Stream the CSV files into a compact StarGraph, leaving person and
+    movie metadata on disk until it is looked up.
+    """
+    global graph, people, movies
+
+    graph, people, movies = ingest.load(directory, names)
+
+
+def load_snapshot(directory):
+    """
+    Maps an up-to-date snapshot of directory, returning whether one was
+    found.
+    """
+    global graph, people, movies
+
+    loaded = snapshot.load(directory)
+    if loaded is None:
+        return False
+    graph, people, movies = loaded
+
+    names.clear()
+    for person_id, name in zip(graph.person_ids, people.column("name")):
+        names.setdefault(name.lower(), set()).add(person_id)
+    return True
+
+
 def main():
-    if len(sys.argv) > 2:
-        sys.exit("Usage: python degrees.py [directory]")
-    directory = sys.argv[1] if len(sys.argv) == 2 else "large"
+    parser = argparse.ArgumentParser(description="Degrees of separation.")
+    parser.add_argument("directory", nargs="?", default="large")
+    parser.add_argument("--engine", choices=sorted(ENGINES), default="bfs",
+                        help="search algorithm used to find the path")
+    parser.add_argument("--time", action="store_true",
+                        help="report how long the search took on stderr")
+    parser.add_argument("--compact", action="store_true",
+                        help="load the graph as integer-indexed CSR arrays")
+    parser.add_argument("--no-snapshot", action="store_true",
+                        help="with --compact, always parse the CSV files")
+    parser.add_argument("--batch", metavar="FILE",
+                        help="answer CSV source,target pairs from FILE "
+                             "('-' for stdin) as JSON lines")
+    parser.add_argument("--workers", type=int, default=os.cpu_count(),
+                        help="processes used in batch mode")
+    parser.add_argument("--paths", type=int, metavar="N",
+                        help="print up to N shortest paths (0 for all) "
+                             "instead of one")
+    parser.add_argument("--years", type=year_range, metavar="FIRST-LAST",
+                        help="only follow movies released in these years; "
+                             "either bound may be left out")
+    parser.add_argument("--only-movie", action="append", metavar="ID",
+                        help="only follow this movie (repeatable)")
+    parser.add_argument("--exclude-movie", action="append", metavar="ID",
+                        help="never follow this movie (repeatable)")
+    args = parser.parse_args()
+    if args.engine in ("tree", "landmarks") and not args.compact:
+        parser.error(f"--engine {args.engine} requires --compact")
+    filtered = args.years or args.only_movie or args.exclude_movie
+    if filtered and not args.compact:
+        parser.error("movie filters require --compact")
+    if filtered and args.engine in ("tree", "landmarks"):
+        parser.error(f"--engine {args.engine} does not support movie filters")
+
+    # Progress messages go to stderr when stdout carries batch results
+    log = sys.stderr if args.batch else sys.stdout
 
     # Load data from files into memory
-    print("Loading data...")
-    load_data(directory)
-    print("Data loaded.")
+    print("Loading data...", file=log)
+    load_data(args.directory, compact=args.compact,
+              use_snapshot=not args.no_snapshot)
+    print("Data loaded.", file=log)
+    if args.engine == "landmarks" and landmark_index is None:
+        parser.error("--engine landmarks needs an up-to-date landmark index; "
+                     "build one with landmarks.py")
 
-    source = person_id_for_name(input("Name: "))
-    if source is None:
-        sys.exit("Person not found.")
-    target = person_id_for_name(input("Name: "))
-    if target is None:
-        sys.exit("Person not found.")
+    allowed = None
+    if filtered:
+        allowed = movie_filter(args.years, args.only_movie, args.exclude_movie)
+        print(f"Following {len(allowed)} of {graph.movie_count()} movies.",
+              file=log)
 
-    path = shortest_path(source, target)
-    
+    if args.batch:
+        if args.batch == "-":
+            run_batch(sys.stdin, args.engine, args.workers, allowed)
+        else:
+            with open(args.batch, encoding="utf-8", newline="") as f:
+                run_batch(f, args.engine, args.workers, allowed)
+        return
+
+    source = read_person()
+    target = read_person()
+
+    if args.paths is not None:
+        print_all_paths(source, target, args.paths or None, allowed)
+        return
+
+    start = time.perf_counter()
+    if allowed is None:
+        path = ENGINES[args.engine](source, target)
+    else:
+        path = ENGINES[args.engine](source, target, allowed)
+    if args.time:
+        elapsed = time.perf_counter() - start
+        print(f"{args.engine} search took {elapsed:.4f}s", file=sys.stderr)
 
     if path is None:
         print("Not connected.")
     else:
         degrees = len(path)
         print(f"{degrees} degrees of separation.")
-        path = [(None, source)] + path
-        for i in range(degrees):
-            person1 = people[path[i][1]]["name"]
-            person2 = people[path[i + 1][1]]["name"]
-            movie = movies[path[i + 1][0]]["title"]
-            print(f"{i + 1}: {person1} and {person2} starred in {movie}")
+        print_path(source, path)
+
+
+def print_path(source, path):
+    """
+    Prints each step of a path from the source person.
+    """
+    path = [(None, source)] + path
+    for i in range(len(path) - 1):
+        person1 = people[path[i][1]]["name"]
+        person2 = people[path[i + 1][1]]["name"]
+        movie = movies[path[i + 1][0]]["title"]
+        print(f"{i + 1}: {person1} and {person2} starred in {movie}")
+
+
+def print_all_paths(source, target, limit=None, allowed=None):
+    """
+    Prints up to limit shortest paths from source to target, or all of
+    them if limit is None.
+    """
+    paths = all_shortest_paths(source, target, allowed)
+    paths = itertools.islice(paths, limit)
+    count = 0
+    for count, path in enumerate(paths, 1):
+        if count == 1:
+            print(f"{len(path)} degrees of separation.")
+        print(f"Path {count}:")
+        print_path(source, path)
+    if count == 0:
+        print("Not connected.")
+
+
+def read_person():
+    """
+    Prompts for a name and returns its person id, exiting with
+    suggestions if nobody has that name.
+    """
+    name = input("Name: ")
+    person_id = person_id_for_name(name)
+    if person_id is None:
+        suggestions = suggest_names(name)
+        if suggestions:
+            print(f"Did you mean: {', '.join(suggestions)}?")
+        sys.exit("Person not found.")
+    return person_id
+
+
+def run_batch(lines, engine, workers, allowed=None, out=sys.stdout):
+    """
+    Answers every source,target pair read from lines, writing one JSON
+    object per query to out in the order the queries complete. Only
+    movies allowed by the MovieFilter allowed, if given, are followed.
+
+    Workers are forked after the data is loaded, so they share the
+    graph copy-on-write instead of loading it again; the compact graph,
+    whose arrays are never written to, stays shared for the whole run.
+    """
+    global batch_filter
+
+    batch_filter = allowed
+    queries = ((engine, row) for row in csv.reader(lines) if row)
+    if workers <= 1:
+        for result in map(answer_query, queries):
+            print(json.dumps(result), file=out, flush=True)
+        return
+
+    context = multiprocessing.get_context("fork")
+    with context.Pool(workers) as pool:
+        for result in pool.imap_unordered(answer_query, queries, chunksize=8):
+            print(json.dumps(result), file=out, flush=True)
 
 
-def shortest_path(source, target):
+def answer_query(query):
+    """
+    Resolves and answers one batch query, given as (engine, row) where
+    row holds a source and a target person id or name, following only the
+    movies allowed by batch_filter.
+
+    Returns a dictionary describing the result, with the search latency
+    in seconds.
+    """
+    engine, row = query
+    result = {"query": row}
+    if len(row) != 2:
+        result["error"] = "expected a source and a target"
+        return result
+
+    source = resolve_person(row[0])
+    target = resolve_person(row[1])
+    if source is None or target is None:
+        result["error"] = "person not found"
+        return result
+
+    start = time.perf_counter()
+    try:
+        if batch_filter is None:
+            path = ENGINES[engine](source, target)
+        else:
+            path = ENGINES[engine](source, target, batch_filter)
+    except Exception as e:
+        # One failed search must not take down the whole batch
+        result["error"] = f"search failed: {e}"
+        return result
+    result["latency"] = time.perf_counter() - start
+    result["source"] = source
+    result["target"] = target
+    result["degrees"] = None if path is None else len(path)
+    result["path"] = path
+    return result
+
+
+def resolve_person(text):
+    """
+    Returns the person id for text, which may be an id or a name, without
+    prompting. Returns None if the name is unknown.
+    """
+    if text in people:
+        return text
+    return person_id_for_name(text, interactive=False)
+
+
+def shortest_path(source, target, allowed=None):
     """
     Returns the shortest list of (movie_id, person_id) pairs
-    that connect the source to the target.
+    that connect the source to the target, following only the movies
+    allowed by the MovieFilter allowed if one is given.
 
     If no possible path, returns None.
     """
-    explored = 0
-    #from source, see neighbours
-    
-    qf = QueueFrontier()
-    initial_state = Node(state=source, parent= None, action= None)
-    qf.add(initial_state)
-    while qf.empty != True:
-        node = qf.remove()
-        explored += 1
-        neighbors = neighbors_for_person(node.state)
-        for moviepersonpair in neighbors:
-            qf.add(Node(state= moviepersonpair[1], parent= node, action= moviepersonpair[0]))
-        givennode = qf.contains_state(target)
-
-
-        if givennode != None:
-            list1 = []
-            while givennode != None:
-                print(givennode.action)
-                pair = (givennode.action, givennode.state)
-                list1.append(pair)
-                givennode = givennode.parent if givennode.parent.action != None else None
-            list1.reverse()
-            return list1
+    return run_search(breadth_first, source, target, allowed)
+
+
+def breadth_first(source, target, neighbors):
+    """
+    Breadth-first search from source to target, where neighbors(state)
+    yields (action, state) pairs.
+    """
+    if source == target:
+        return []
+
+    # Each person enters the frontier at most once
+    frontier = IndexedQueueFrontier(dedupe=True)
+    frontier.add(Node(state=source, parent=None, action=None))
+    while not frontier.empty():
+        node = frontier.remove()
+        for movie_id, person_id in neighbors(node.state):
+            child = Node(state=person_id, parent=node, action=movie_id)
+            if person_id == target:
+                return path_to(child)
+            frontier.add(child)
     return None
 
 
-        
-    
+def path_to(node):
+    """
+    Follows parent links from node back to the search root, returning
+    the (movie_id, person_id) pairs along the way in order.
+    """
+    path = []
+    while node.parent is not None:
+        path.append((node.action, node.state))
+        node = node.parent
+    path.reverse()
+    return path
+
+
+def shortest_path_bidirectional(source, target, allowed=None):
+    """
+    Returns the shortest list of (movie_id, person_id) pairs
+    that connect the source to the target, growing breadth-first
+    frontiers from both ends and always expanding the smaller one.
+    Only movies allowed by the MovieFilter allowed, if given, are followed.
+
+    If no possible path, returns None.
+    """
+    return run_search(bidirectional, source, target, allowed)
+
+
+def bidirectional(source, target, neighbors):
+    """
+    Bidirectional breadth-first search from source to target, where
+    neighbors(state) yields (action, state) pairs.
+    """
+    if source == target:
+        return []
+
+    # Maps each reached person to the (movie_id, person_id) step that reached it
+    forward = {source: None}
+    backward = {target: None}
+    forward_frontier = [source]
+    backward_frontier = [target]
+
+    while forward_frontier and backward_frontier:
+        if len(forward_frontier) <= len(backward_frontier):
+            forward_frontier, meeting = expand_level(
+                forward_frontier, forward, backward, neighbors
+            )
+        else:
+            backward_frontier, meeting = expand_level(
+                backward_frontier, backward, forward, neighbors
+            )
+        if meeting is not None:
+            return stitch_path(meeting, forward, backward)
+    return None
+
 
+def expand_level(frontier, parents, opposite, neighbors):
+    """
+    Expands every person in one breadth-first level, recording how each
+    newly reached person was reached in `parents`.
 
+    Returns the next level and the first person also reached from the
+    opposite direction, or None if the two searches have not met yet.
+    Because whole levels are expanded in turn, the first meeting point
+    found always lies on a shortest path.
+    """
+    next_frontier = []
+    for person_id in frontier:
+        for movie_id, neighbor_id in neighbors(person_id):
+            if neighbor_id in parents:
+                continue
+            parents[neighbor_id] = (movie_id, person_id)
+            if neighbor_id in opposite:
+                return next_frontier, neighbor_id
+            next_frontier.append(neighbor_id)
+    return next_frontier, None
+
+
+def stitch_path(meeting, forward, backward):
+    """
+    Joins the forward and backward search trees at `meeting` into a list
+    of (movie_id, person_id) pairs leading from the source to the target.
+    """
+    path = []
+    person_id = meeting
+    while forward[person_id] is not None:
+        movie_id, previous_id = forward[person_id]
+        path.append((movie_id, person_id))
+        person_id = previous_id
+    path.reverse()
 
+    person_id = meeting
+    while backward[person_id] is not None:
+        movie_id, next_id = backward[person_id]
+        path.append((movie_id, next_id))
+        person_id = next_id
+    return path
 
 
-def person_id_for_name(name):
+def run_search(search, source, target, allowed=None):
+    """
+    Runs a search core between two person ids. When the compact graph is
+    loaded the search runs on integer ids and the path is mapped back.
+    """
+    if graph is None:
+        if allowed is not None:
+            raise ValueError("movie filters need data loaded with compact=True")
+        return search(source, target, neighbors_for_person)
+
+    path = search(graph.person_index[source], graph.person_index[target],
+                  compact_neighbors(allowed))
+    return path_ids(path)
+
+
+def compact_neighbors(allowed=None):
+    """
+    Returns the neighbors function of the compact graph, following only
+    the movies allowed by the MovieFilter allowed if one is given.
+    """
+    if allowed is None:
+        return graph.neighbors
+    mask = allowed.mask
+    return lambda person: graph.neighbors(person, mask)
+
+
+def path_ids(path):
+    """
+    Maps a path of (movie, person) indices in the compact graph to
+    (movie_id, person_id) pairs, passing None through.
+    """
+    if path is None:
+        return None
+    return [(graph.movie_ids[movie], graph.person_ids[person])
+            for movie, person in path]
+
+
+def all_shortest_paths(source, target, allowed=None):
+    """
+    Yields every shortest list of (movie_id, person_id) pairs that connect
+    the source to the target, one at a time, so callers can stop after as
+    many as they need. Only movies allowed by the MovieFilter allowed, if
+    given, are followed.
+
+    If no possible path, yields nothing.
+    """
+    if graph is None:
+        if allowed is not None:
+            raise ValueError("movie filters need data loaded with compact=True")
+        yield from shortest_path_dag(source, target, neighbors_for_person)
+        return
+
+    paths = shortest_path_dag(graph.person_index[source],
+                              graph.person_index[target],
+                              compact_neighbors(allowed))
+    for path in paths:
+        yield path_ids(path)
+
+
+def shortest_path_dag(source, target, neighbors):
+    """
+    Yields every shortest path from source to target, where
+    neighbors(state) yields (action, state) pairs.
+
+    A layered breadth-first search records the depth of each person until
+    the target is reached. The shortest paths then form a DAG in which a
+    person's predecessors are its neighbors one layer closer to the
+    source, and the DAG is walked depth-first back from the target, so
+    only one path is held at a time.
+    """
+    if source == target:
+        yield []
+        return
+
+    depth = layer_depths(source, target, neighbors)
+    if depth is None:
+        return
+
+    # Predecessors of the people reached so far by the walk
+    predecessors = {}
+
+    def steps_into(person):
+        if person not in predecessors:
+            previous_depth = depth[person] - 1
+            predecessors[person] = [
+                (action, state) for action, state in neighbors(person)
+                if depth.get(state) == previous_depth
+            ]
+        return predecessors[person]
+
+    # Steps from the target back towards the source, and for each person
+    # on the way the predecessors left to try
+    path = []
+    people_on_path = [target]
+    remaining = [iter(steps_into(target))]
+    while remaining:
+        step = next(remaining[-1], None)
+        if step is None:
+            remaining.pop()
+            people_on_path.pop()
+            if path:
+                path.pop()
+            continue
+
+        action, previous = step
+        path.append((action, people_on_path[-1]))
+        if previous == source:
+            yield path[::-1]
+            path.pop()
+        else:
+            people_on_path.append(previous)
+            remaining.append(iter(steps_into(previous)))
+
+
+def layer_depths(source, target, neighbors):
+    """
+    Breadth-first search from source that stops as soon as target is
+    reached, returning the depth of every person reached, or None if the
+    target is unreachable. Every layer before the target's is complete.
+    """
+    depth = {source: 0}
+    layer = [source]
+    while layer:
+        next_layer = []
+        for state in layer:
+            for _, neighbor in neighbors(state):
+                if neighbor in depth:
+                    continue
+                depth[neighbor] = depth[state] + 1
+                if neighbor == target:
+                    return depth
+                next_layer.append(neighbor)
+        layer = next_layer
+    return None
+
+
+def source_tree(source):
+    """
+    Returns the SourceTree of everyone reachable from the source person,
+    running a single-source breadth-first search over the whole compact
+    graph unless the tree is among the most recently used ones.
+    """
+    tree = source_trees.get(source)
+    if tree is None:
+        if graph is None:
+            raise ValueError("source trees need data loaded with compact=True")
+        tree = SourceTree.build(graph, graph.person_index[source])
+    remember_tree(source, tree)
+    return tree
+
+
+def remember_tree(source, tree):
+    """
+    Marks tree as the most recently used, evicting the least recently
+    used trees beyond SOURCE_TREE_CACHE_SIZE.
+    """
+    source_trees[source] = tree
+    source_trees.move_to_end(source)
+    while len(source_trees) > SOURCE_TREE_CACHE_SIZE:
+        source_trees.popitem(last=False)
+
+
+def save_source_tree(source, path):
+    """
+    Writes the SourceTree of the source person to path.
+    """
+    source_tree(source).save(path)
+
+
+def load_source_tree(path):
+    """
+    Reads a SourceTree saved for the currently loaded graph into the cache,
+    returning its source person_id.
+    """
+    tree = SourceTree.load(path)
+    if graph is None or len(tree.distance) != graph.person_count():
+        raise ValueError(f"{path} does not match the loaded graph")
+    source = graph.person_ids[tree.source]
+    remember_tree(source, tree)
+    return source
+
+
+def shortest_path_from_tree(source, target):
+    """
+    Returns the shortest list of (movie_id, person_id) pairs that connect
+    the source to the target, read from the source's SourceTree in time
+    proportional to the length of the path.
+
+    If no possible path, returns None.
+    """
+    return path_ids(source_tree(source).path_to(graph.person_index[target]))
+
+
+def shortest_path_landmarks(source, target):
+    """
+    Returns the shortest list of (movie_id, person_id) pairs that connect
+    the source to the target, using an A* search guided and pruned by the
+    landmark index.
+
+    If no possible path, returns None.
+    """
+    if landmark_index is None:
+        raise ValueError("no landmark index; build one with landmarks.py")
+    path = landmarks.landmark_search(landmark_index, graph,
+                                     graph.person_index[source],
+                                     graph.person_index[target])
+    return path_ids(path)
+
+
+def separation_bounds(source, target):
+    """
+    Returns (lower, upper) bounds on the degrees of separation between two
+    people from the landmark index, without searching. See
+    LandmarkIndex.bounds for when either bound is None.
+    """
+    if landmark_index is None:
+        raise ValueError("no landmark index; build one with landmarks.py")
+    return landmark_index.bounds(graph.person_index[source],
+                                 graph.person_index[target])
+
+
+# Search algorithms selectable with --engine
+ENGINES = {
+    "bfs": shortest_path,
+    "bidirectional": shortest_path_bidirectional,
+    "tree": shortest_path_from_tree,
+    "landmarks": shortest_path_landmarks,
+}
+
+
+def movie_filter(years=None, only=None, exclude=None):
+    """
+    Compiles a MovieFilter over the compact graph allowing movies released
+    within years, a (first, last) pair whose bounds may be None, that are
+    among the movie ids in only, if given, and not in exclude.
+    """
+    if graph is None:
+        raise ValueError("movie filters need data loaded with compact=True")
+    allowed = MovieFilter.everything(graph)
+    if years is not None:
+        allowed &= MovieFilter.years(movies.column("year"), *years)
+    if only is not None:
+        allowed &= MovieFilter.only(graph, only)
+    if exclude is not None:
+        allowed &= MovieFilter.excluding(graph, exclude)
+    return allowed
+
+
+def year_range(text):
+    """
+    Parses FIRST-LAST, FIRST-, -LAST or a single year into a (first, last)
+    pair, with None for an open bound.
+    """
+    first, separator, last = text.partition("-")
+    try:
+        first = int(first) if first else None
+        last = int(last) if last else None
+    except ValueError:
+        raise argparse.ArgumentTypeError(f"invalid year range: {text!r}")
+    if not separator:
+        last = first
+    return first, last
+
+
+def person_id_for_name(name, interactive=True):
     """
     Returns the IMDB id for a person's name,
     resolving ambiguities as needed.
+
+    With interactive=False, ambiguities are resolved without prompting by
+    picking the person who starred in the most movies.
     """
+    if not interactive:
+        return name_index.best(name)
+
     person_ids = list(names.get(name.lower(), set()))
     if len(person_ids) == 0:
         return None
@@ -152,11 +772,38 @@ def person_id_for_name(name):
         return person_ids[0]
 
 
+def movie_count(person_id):
+    """
+    Returns the number of movies a person starred in.
+    """
+    if graph is not None:
+        person = graph.person_index[person_id]
+        return graph.person_offsets[person + 1] - graph.person_offsets[person]
+    return len(people[person_id]["movies"])
+
+
+def suggest_names(text, k=5):
+    """
+    Returns up to k names within one typo of text, or else starting with
+    text, with the most prolific people first.
+    """
+    person_ids = [person_id for person_id, _ in name_index.fuzzy(text, k)]
+    if not person_ids:
+        person_ids = name_index.prefix(text, k)
+    return [people[person_id]["name"] for person_id in person_ids]
+
+
 def neighbors_for_person(person_id):
     """
     Returns (movie_id, person_id) pairs for people
     who starred with a given person.
     """
+    if graph is not None:
+        return (
+            (graph.movie_ids[movie], graph.person_ids[person])
+            for movie, person in graph.neighbors(graph.person_index[person_id])
+        )
+
     movie_ids = people[person_id]["movies"]
     neighbors = set()
     for movie_id in movie_ids:
@@ -0,0 +1,254 @@
+"""
+Compact, integer-indexed form of the degrees star graph.
+"""
+import struct
+from array import array
+
+
+class StarGraph():
+    """
+    Bipartite graph of people and the movies they starred in.
+
+    Person and movie ids are remapped to dense ints in the order they were
+    loaded. Both directions of the graph are stored as compressed sparse
+    rows: the movies of person p are
+    person_movies[person_offsets[p]:person_offsets[p + 1]], and the stars
+    of movie m are movie_people[movie_offsets[m]:movie_offsets[m + 1]].
+    """
+
+    def __init__(self, person_ids, movie_ids, person_offsets, person_movies,
+                 movie_offsets, movie_people, person_index=None,
+                 movie_index=None):
+        self.person_ids = person_ids
+        self.movie_ids = movie_ids
+
+        # Memoryviews make slicing a row free of copies
+        self.person_offsets = memoryview(person_offsets)
+        self.person_movies = memoryview(person_movies)
+        self.movie_offsets = memoryview(movie_offsets)
+        self.movie_people = memoryview(movie_people)
+        self._person_index = person_index
+        self._movie_index = movie_index
+
+    @classmethod
+    def from_edges(cls, person_ids, movie_ids, edges, **kwargs):
+        """
+        Builds a graph from lists of person and movie ids and an iterable
+        of (person, movie) index pairs. Duplicate pairs are dropped.
+        """
+        edge_people = array("i")
+        edge_movies = array("i")
+        for person, movie in edges:
+            edge_people.append(person)
+            edge_movies.append(movie)
+        return cls.from_arrays(person_ids, movie_ids, edge_people,
+                               edge_movies, **kwargs)
+
+    @classmethod
+    def from_arrays(cls, person_ids, movie_ids, edge_people, edge_movies,
+                    **kwargs):
+        """
+        Builds a graph from lists of person and movie ids and two parallel
+        int arrays holding the person and movie index of each edge.
+        Duplicate edges are dropped.
+        """
+        person_count = len(person_ids)
+        movie_count = len(movie_ids)
+
+        # Counting sort of the edges by person
+        person_offsets = array("q", bytes(8 * (person_count + 1)))
+        for person in edge_people:
+            person_offsets[person + 1] += 1
+        cumulative(person_offsets)
+        grouped = array("i", bytes(4 * len(edge_people)))
+        position = array("q", person_offsets[:-1])
+        for person, movie in zip(edge_people, edge_movies):
+            grouped[position[person]] = movie
+            position[person] += 1
+        del position
+
+        # Drop repeated movies within each row, compacting in place
+        last_person = array("i", [-1]) * movie_count
+        movie_offsets = array("q", bytes(8 * (movie_count + 1)))
+        size = 0
+        start = 0
+        for person in range(person_count):
+            end = person_offsets[person + 1]
+            person_offsets[person] = size
+            for movie in grouped[start:end]:
+                if last_person[movie] != person:
+                    last_person[movie] = person
+                    grouped[size] = movie
+                    size += 1
+                    movie_offsets[movie + 1] += 1
+            start = end
+        person_offsets[person_count] = size
+        del last_person
+        person_movies = grouped[:size]
+        del grouped
+        cumulative(movie_offsets)
+
+        # Counting sort of the same edges by movie
+        movie_people = array("i", bytes(4 * size))
+        position = array("q", movie_offsets[:-1])
+        for person in range(person_count):
+            for movie in person_movies[person_offsets[person]:person_offsets[person + 1]]:
+                movie_people[position[movie]] = person
+                position[movie] += 1
+
+        return cls(person_ids, movie_ids, person_offsets, person_movies,
+                   movie_offsets, movie_people, **kwargs)
+
+    @property
+    def person_index(self):
+        """
+        Maps person ids to their dense index, built on first use.
+        """
+        if self._person_index is None:
+            self._person_index = {
+                person_id: i for i, person_id in enumerate(self.person_ids)
+            }
+        return self._person_index
+
+    @property
+    def movie_index(self):
+        """
+        Maps movie ids to their dense index, built on first use.
+        """
+        if self._movie_index is None:
+            self._movie_index = {
+                movie_id: i for i, movie_id in enumerate(self.movie_ids)
+            }
+        return self._movie_index
+
+    def person_count(self):
+        return len(self.person_offsets) - 1
+
+    def movie_count(self):
+        return len(self.movie_offsets) - 1
+
+    def movies_of(self, person):
+        offsets = self.person_offsets
+        return self.person_movies[offsets[person]:offsets[person + 1]]
+
+    def stars_of(self, movie):
+        offsets = self.movie_offsets
+        return self.movie_people[offsets[movie]:offsets[movie + 1]]
+
+    def neighbors(self, person, allowed=None):
+        """
+        Yields (movie, person) index pairs for people who starred with
+        a given person. If allowed is given, such as a MovieFilter mask,
+        only movies m with allowed[m] set are followed.
+        """
+        movie_offsets = self.movie_offsets
+        movie_people = self.movie_people
+        for movie in self.movies_of(person):
+            if allowed is not None and not allowed[movie]:
+                continue
+            for other in movie_people[movie_offsets[movie]:movie_offsets[movie + 1]]:
+                yield movie, other
+
+
+def cumulative(counts):
+    """
+    Turns per-row counts (shifted by one) into CSR row offsets in place.
+    """
+    for i in range(1, len(counts)):
+        counts[i] += counts[i - 1]
+    return counts
+
+
+class SourceTree():
+    """
+    Breadth-first tree of everyone reachable from one source person.
+
+    distance[p] is the degrees of separation between the source and
+    person p, or -1 if they are not connected. For every other reached
+    person, parent[p] is the previous person on a shortest path from the
+    source and via[p] the movie they starred in together.
+    """
+
+    MAGIC = b"DEGTREE1"
+    HEADER = struct.Struct("<8sqq")
+
+    def __init__(self, source, distance, parent, via):
+        self.source = source
+        self.distance = distance
+        self.parent = parent
+        self.via = via
+
+    @classmethod
+    def build(cls, graph, source):
+        """
+        Runs one breadth-first search from source over the whole graph.
+        """
+        count = graph.person_count()
+        distance = array("h", [-1]) * count
+        parent = array("i", [-1]) * count
+        via = array("i", [-1]) * count
+
+        # A movie's cast only needs to be scanned the first time it is seen
+        seen_movies = bytearray(graph.movie_count())
+        movie_offsets = graph.movie_offsets
+        movie_people = graph.movie_people
+
+        distance[source] = 0
+        level = [source]
+        depth = 0
+        while level:
+            depth += 1
+            next_level = []
+            for person in level:
+                for movie in graph.movies_of(person):
+                    if seen_movies[movie]:
+                        continue
+                    seen_movies[movie] = 1
+                    for other in movie_people[movie_offsets[movie]:movie_offsets[movie + 1]]:
+                        if distance[other] < 0:
+                            distance[other] = depth
+                            parent[other] = person
+                            via[other] = movie
+                            next_level.append(other)
+            level = next_level
+        return cls(source, distance, parent, via)
+
+    def path_to(self, target):
+        """
+        Returns the (movie, person) index pairs leading from the source to
+        target, or None if target cannot be reached.
+        """
+        if self.distance[target] < 0:
+            return None
+        path = []
+        while target != self.source:
+            path.append((self.via[target], target))
+            target = self.parent[target]
+        path.reverse()
+        return path
+
+    def save(self, path):
+        """
+        Writes the tree to a binary file.
+        """
+        with open(path, "wb") as f:
+            f.write(self.HEADER.pack(self.MAGIC, self.source, len(self.distance)))
+            self.distance.tofile(f)
+            self.parent.tofile(f)
+            self.via.tofile(f)
+
+    @classmethod
+    def load(cls, path):
+        """
+        Reads a tree written by save.
+        """
+        with open(path, "rb") as f:
+            magic, source, count = cls.HEADER.unpack(f.read(cls.HEADER.size))
+            if magic != cls.MAGIC:
+                raise ValueError(f"{path} is not a saved source tree")
+            arrays = []
+            for typecode in ("h", "i", "i"):
+                values = array(typecode)
+                values.fromfile(f, count)
+                arrays.append(values)
+        return cls(source, *arrays)
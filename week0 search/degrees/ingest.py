@@ -0,0 +1,192 @@
+"""
+Streaming, memory-bounded loader for the degrees CSV files.
+
+Only the graph topology is held in memory, as fixed-width int arrays.
+Person and movie metadata stay on disk: the loader records the byte
+offset of every row, and CsvRecords reads a row back only when it is
+looked up, which in practice is only when printing results.
+"""
+import csv
+import os
+from array import array
+from collections.abc import Mapping
+
+from graph import StarGraph
+
+# Bytes of stars.csv read at a time
+CHUNK_SIZE = 1 << 20
+
+
+class OffsetLines():
+    """
+    Iterates over the decoded lines of a binary file, keeping track of the
+    byte offset of the next unread line.
+    """
+
+    def __init__(self, f):
+        self.f = f
+        self.position = f.tell()
+
+    def __iter__(self):
+        return self
+
+    def __next__(self):
+        line = self.f.readline()
+        if not line:
+            raise StopIteration
+        self.position += len(line)
+        return line.decode("utf-8")
+
+
+class CsvRecords(Mapping):
+    """
+    Read-only mapping from ids to metadata dictionaries, such as
+    {"name": ..., "birth": ...}, read on demand from the rows of a CSV
+    file at recorded byte offsets.
+    """
+
+    def __init__(self, path, key_field, fields, positions, ids, index,
+                 offsets):
+        self.path = path
+        self.key_field = key_field
+        self.fields = fields
+        self.positions = positions
+        self.ids = ids
+        self.index = index
+        self.offsets = offsets
+        self.file = None
+
+    def row(self, i):
+        """
+        Returns the metadata of record i, read from its row of the file.
+        """
+        if self.file is None:
+            self.file = open(self.path, "rb")
+        self.file.seek(self.offsets[i])
+        values = next(csv.reader(OffsetLines(self.file)))
+        return {field: values[self.positions[field]] for field in self.fields}
+
+    def column(self, field):
+        """
+        Returns a list of one field of every record, in id index order,
+        read in a single pass over the file.
+        """
+        column = [""] * len(self.ids)
+        key = self.positions[self.key_field]
+        with open(self.path, encoding="utf-8", newline="") as f:
+            reader = csv.reader(f)
+            next(reader)
+            for values in reader:
+                if values:
+                    i = self.index[values[key]]
+                    column[i] = values[self.positions[field]]
+        return column
+
+    def __getitem__(self, key):
+        return self.row(self.index[key])
+
+    def __iter__(self):
+        return iter(self.ids)
+
+    def __len__(self):
+        return len(self.ids)
+
+    def __contains__(self, key):
+        return key in self.index
+
+
+def read_table(path, key_field, fields, on_row=None):
+    """
+    Streams the rows of a CSV file, assigning each distinct value of
+    key_field a dense index.
+
+    Returns CsvRecords for the file. on_row, if given, is called with the
+    key and row dictionary of each row.
+    """
+    ids = []
+    index = {}
+    offsets = array("q")
+    with open(path, "rb") as f:
+        lines = OffsetLines(f)
+        reader = csv.reader(lines)
+        header = next(reader)
+        positions = {field: i for i, field in enumerate(header)}
+        while True:
+            offset = lines.position
+            values = next(reader, None)
+            if values is None:
+                break
+            if not values:
+                continue
+            key = values[positions[key_field]]
+            if key in index:
+                offsets[index[key]] = offset
+            else:
+                index[key] = len(ids)
+                ids.append(key)
+                offsets.append(offset)
+            if on_row is not None:
+                on_row(key, {field: values[positions[field]]
+                             for field in fields})
+
+    return CsvRecords(path, key_field, fields, positions, ids, index, offsets)
+
+
+def read_stars(path, person_index, movie_index):
+    """
+    Streams stars.csv in fixed-size chunks, returning parallel arrays of
+    person and movie indices. Rows naming unknown ids are skipped.
+    """
+    edge_people = array("i")
+    edge_movies = array("i")
+    with open(path, "rb") as f:
+        header = [field.strip(b'"')
+                  for field in f.readline().strip().split(b",")]
+        person_column = header.index(b"person_id")
+        movie_column = header.index(b"movie_id")
+
+        remainder = b""
+        while True:
+            chunk = f.read(CHUNK_SIZE)
+            lines = (remainder + chunk).split(b"\n")
+
+            # The last line may continue in the next chunk
+            remainder = lines.pop() if chunk else b""
+            for line in lines:
+                values = line.strip().split(b",")
+                if len(values) < len(header):
+                    continue
+                person_id = values[person_column].strip(b'"').decode()
+                movie_id = values[movie_column].strip(b'"').decode()
+                person = person_index.get(person_id)
+                movie = movie_index.get(movie_id)
+                if person is not None and movie is not None:
+                    edge_people.append(person)
+                    edge_movies.append(movie)
+            if not chunk:
+                break
+    return edge_people, edge_movies
+
+
+def load(directory, names):
+    """
+    Streams the CSV files of directory into a StarGraph, filling names
+    with the lowercase name to person ids mapping.
+
+    Returns (graph, people, movies), where people and movies are
+    CsvRecords over people.csv and movies.csv.
+    """
+    def add_name(person_id, row):
+        names.setdefault(row["name"].lower(), set()).add(person_id)
+
+    people = read_table(os.path.join(directory, "people.csv"), "id",
+                        ("name", "birth"), on_row=add_name)
+    movies = read_table(os.path.join(directory, "movies.csv"), "id",
+                        ("title", "year"))
+    edge_people, edge_movies = read_stars(
+        os.path.join(directory, "stars.csv"), people.index, movies.index
+    )
+    graph = StarGraph.from_arrays(people.ids, movies.ids, edge_people,
+                                  edge_movies, person_index=people.index,
+                                  movie_index=movies.index)
+    return graph, people, movies
@@ -0,0 +1,270 @@
+"""
+Landmark distance index for the degrees star graph.
+
+Distances from a few well-connected landmark people bound the degrees of
+separation between any two people by the triangle inequality. As in the
+ALT variant of A*, the bounds also prune the search: a person is only
+expanded if its distance so far plus the lower bound on the rest of the
+way stays within the upper bound.
+
+Usage: python landmarks.py [directory] [-k LANDMARKS]
+"""
+import argparse
+import mmap
+import os
+import struct
+import time
+from array import array
+
+import snapshot
+from graph import SourceTree
+
+MAGIC = b"DEGLMRK1"
+FILENAME = "degrees.landmarks"
+
+# Magic, CSV fingerprint, number of landmarks, number of people
+HEADER = struct.Struct(f"<8s{2 * len(snapshot.CSV_FILES)}qqq")
+
+
+class LandmarkIndex():
+    """
+    Breadth-first distances from each landmark to every person, where
+    distances[i][p] is -1 if person p cannot reach landmark i.
+    """
+
+    def __init__(self, landmarks, distances):
+        self.landmarks = landmarks
+        self.distances = distances
+
+    @classmethod
+    def build(cls, graph, k=16):
+        """
+        Picks k well-connected landmarks, preferring people with the most
+        co-star slots who are not co-stars of an earlier landmark, and
+        runs one breadth-first search from each.
+        """
+        movie_offsets = graph.movie_offsets
+
+        def degree(person):
+            return sum(movie_offsets[movie + 1] - movie_offsets[movie]
+                       for movie in graph.movies_of(person))
+
+        candidates = sorted(range(graph.person_count()), key=degree,
+                            reverse=True)
+        landmarks = array("i")
+        distances = []
+        for person in candidates:
+            if len(landmarks) == k:
+                break
+            if any(0 <= d[person] <= 1 for d in distances):
+                continue
+            landmarks.append(person)
+            distances.append(SourceTree.build(graph, person).distance)
+        return cls(landmarks, distances)
+
+    def relevant(self, source, target):
+        """
+        Returns the distance arrays of landmarks that reach both source
+        and target, or None if some landmark reaches only one of them,
+        which proves the two are not connected.
+        """
+        relevant = []
+        for d in self.distances:
+            reaches_source = d[source] >= 0
+            if reaches_source != (d[target] >= 0):
+                return None
+            if reaches_source:
+                relevant.append(d)
+        return relevant
+
+    def bounds(self, source, target):
+        """
+        Returns (lower, upper) bounds on the degrees of separation between
+        source and target. The upper bound is None if no landmark reaches
+        both, and both bounds are None if they are provably not connected.
+        """
+        relevant = self.relevant(source, target)
+        if relevant is None:
+            return None, None
+        lower = max((abs(d[source] - d[target]) for d in relevant), default=0)
+        upper = min((d[source] + d[target] for d in relevant), default=None)
+        return lower, upper
+
+    def save(self, path, stamp):
+        """
+        Writes the index, tagged with the CSV fingerprint stamp.
+        """
+        temporary = f"{path}.{os.getpid()}.tmp"
+        with open(temporary, "wb") as f:
+            count = len(self.distances[0]) if self.distances else 0
+            f.write(HEADER.pack(MAGIC, *stamp, len(self.landmarks), count))
+            self.landmarks.tofile(f)
+            for d in self.distances:
+                f.write(d)
+        os.replace(temporary, path)
+
+    @classmethod
+    def load(cls, path, stamp):
+        """
+        Maps an index written by save, or returns None if there is none or
+        it was built from different CSV files.
+        """
+        try:
+            with open(path, "rb") as f:
+                buffer = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        except (OSError, ValueError):
+            return None
+
+        view = memoryview(buffer)
+        if len(view) < HEADER.size:
+            return None
+        magic, *fields = HEADER.unpack_from(view)
+        k, count = fields[-2:]
+        if magic != MAGIC or tuple(fields[:-2]) != stamp:
+            return None
+
+        offset = HEADER.size + 4 * k
+        landmarks = view[HEADER.size:offset].cast("i")
+        distances = []
+        for _ in range(k):
+            distances.append(view[offset:offset + 2 * count].cast("h"))
+            offset += 2 * count
+        return cls(landmarks, distances)
+
+
+def index_path(directory):
+    return os.path.join(directory, FILENAME)
+
+
+class Side():
+    """
+    One direction of a bidirectional search: the people reached so far,
+    mapped to (depth, movie, previous person), the current level, the
+    movies whose casts have been scanned, and the landmark distances of
+    the goal at the far end.
+    """
+
+    def __init__(self, start, goals):
+        self.parents = {start: (0, None, None)}
+        self.frontier = [start]
+        self.depth = 0
+        self.scanned = set()
+        self.goals = goals
+
+    def lower_bound(self, person):
+        """
+        Landmark lower bound on the distance from person to the goal.
+        """
+        return max((abs(d[person] - goal) for d, goal in self.goals),
+                   default=0)
+
+
+def landmark_search(index, graph, source, target):
+    """
+    Bidirectional breadth-first search from source to target over a
+    StarGraph, pruned A*-style: a person reached at depth g is dropped
+    when g plus the landmark lower bound on its remaining distance
+    exceeds the landmark upper bound on the whole path.
+
+    Returns a list of (movie, person) index pairs, or None if there is
+    no path.
+    """
+    if source == target:
+        return []
+    relevant = index.relevant(source, target)
+    if relevant is None:
+        return None
+    upper = min((d[source] + d[target] for d in relevant),
+                default=float("inf"))
+
+    forward = Side(source, [(d, d[target]) for d in relevant])
+    backward = Side(target, [(d, d[source]) for d in relevant])
+    movie_offsets = graph.movie_offsets
+    movie_people = graph.movie_people
+
+    # Paths not yet found are at least as long as the two depths plus one
+    best, meeting = float("inf"), None
+    while (forward.frontier and backward.frontier
+           and best > forward.depth + backward.depth + 1):
+        if len(forward.frontier) <= len(backward.frontier):
+            side, other = forward, backward
+        else:
+            side, other = backward, forward
+
+        depth = side.depth + 1
+        next_frontier = []
+        for person in side.frontier:
+            for movie in graph.movies_of(person):
+                if movie in side.scanned:
+                    continue
+                side.scanned.add(movie)
+                for star in movie_people[movie_offsets[movie]:movie_offsets[movie + 1]]:
+                    if star in side.parents:
+                        continue
+                    if depth + side.lower_bound(star) > upper:
+                        continue
+                    side.parents[star] = (depth, movie, person)
+                    next_frontier.append(star)
+                    if star in other.parents:
+                        length = depth + other.parents[star][0]
+                        if length < best:
+                            best, meeting = length, star
+                        if best <= depth + other.depth:
+                            return join_paths(forward, backward, meeting)
+        side.frontier = next_frontier
+        side.depth = depth
+
+    if meeting is None:
+        return None
+    return join_paths(forward, backward, meeting)
+
+
+def join_paths(forward, backward, meeting):
+    """
+    Joins the two search trees at meeting into a list of (movie, person)
+    pairs from the forward start to the backward start.
+    """
+    path = []
+    person = meeting
+    while forward.parents[person][2] is not None:
+        _, movie, previous = forward.parents[person]
+        path.append((movie, person))
+        person = previous
+    path.reverse()
+    person = meeting
+    while backward.parents[person][2] is not None:
+        _, movie, following = backward.parents[person]
+        path.append((movie, following))
+        person = following
+    return path
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Build the landmark index for a degrees dataset."
+    )
+    parser.add_argument("directory", nargs="?", default="large")
+    parser.add_argument("-k", "--landmarks", type=int, default=16,
+                        help="number of landmarks to pick")
+    args = parser.parse_args()
+
+    # Imported here since degrees itself imports this module
+    import degrees
+
+    print("Loading data...")
+    degrees.load_data(args.directory, compact=True)
+    print("Data loaded.")
+
+    start = time.perf_counter()
+    index = LandmarkIndex.build(degrees.graph, args.landmarks)
+    elapsed = time.perf_counter() - start
+
+    path = index_path(args.directory)
+    index.save(path, snapshot.fingerprint(args.directory))
+    size = os.path.getsize(path)
+    print(f"Built {len(index.landmarks)} landmarks in {elapsed:.2f}s, "
+          f"{size / 1024:.1f} KiB written to {path}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,170 @@
+"""
+Name index for resolving free-text person names without prompting.
+"""
+import heapq
+from array import array
+from bisect import bisect_left
+from collections import Counter
+
+# Sorts after every character that can appear in a name
+HIGHEST = chr(0x10FFFF)
+
+# Characters tried when generating typo variants of a query
+ALPHABET_SIZE = 32
+
+
+class NameIndex():
+    """
+    Index over a mapping of lowercase names to sets of person ids, with
+    the names also kept in a sorted list. Supports exact, prefix and
+    one-typo lookups, ranked by weight(person_id), the movie count.
+    """
+
+    def __init__(self, names, weight):
+        self.names = names
+        self.weight = weight
+        self.keys = sorted(names)
+
+        # The most common characters, counted over a sample of names
+        step = max(1, len(self.keys) // 50000)
+        counts = Counter("".join(self.keys[::step]))
+        self.alphabet = "".join(c for c, _ in counts.most_common(ALPHABET_SIZE))
+
+        # Built by the first prefix lookup, see build_ranking
+        self.key_weights = None
+        self.tree = None
+
+    def exact(self, name):
+        """
+        Returns the ids of everyone named name, most movies first.
+        """
+        person_ids = self.names.get(name.lower(), ())
+        return sorted(person_ids, key=self.weight, reverse=True)
+
+    def prefix(self, prefix, k=10):
+        """
+        Returns the ids of the k people with the most movies whose names
+        start with prefix.
+
+        Names with a prefix form a range of the sorted keys. The range is
+        searched best-first: take the key with the heaviest person via the
+        max tree, hand out its people, and split the rest of the range
+        around it. Only O(k) keys are visited however many names match.
+        """
+        if self.tree is None:
+            self.build_ranking()
+        prefix = prefix.lower()
+        start = bisect_left(self.keys, prefix)
+        end = bisect_left(self.keys, prefix + HIGHEST, start)
+
+        # Entries are (-weight, key position, tiebreak, person_id, range)
+        heap = []
+        self.push_range(heap, start, end)
+        result = []
+        while heap and len(result) < k:
+            _, i, _, person_id, bounds = heapq.heappop(heap)
+            if person_id is not None:
+                result.append(person_id)
+                continue
+            lo, hi = bounds
+            for j, person_id in enumerate(self.names[self.keys[i]]):
+                heapq.heappush(heap, (-self.weight(person_id), i, j,
+                                      person_id, None))
+            self.push_range(heap, lo, i)
+            self.push_range(heap, i + 1, hi)
+        return result
+
+    def build_ranking(self):
+        """
+        Computes the heaviest weight under each key once, and a max tree
+        over the sorted keys: tree[n + i] is i, and each inner node holds
+        the position of the heavier key of its two children.
+        """
+        n = len(self.keys)
+        self.key_weights = array("q", (
+            max(map(self.weight, self.names[key])) for key in self.keys
+        ))
+        tree = array("q", bytes(16 * n))
+        tree[n:] = array("q", range(n))
+        self.tree = tree
+        for node in range(n - 1, 0, -1):
+            tree[node] = self.heavier(tree[2 * node], tree[2 * node + 1])
+
+    def heaviest(self, lo, hi):
+        """
+        Returns the position of the heaviest key in keys[lo:hi], the first
+        one on ties, which must be non-empty.
+        """
+        tree = self.tree
+        n = len(self.keys)
+        best = None
+        lo += n
+        hi += n
+        while lo < hi:
+            if lo & 1:
+                best = self.heavier(best, tree[lo])
+                lo += 1
+            if hi & 1:
+                hi -= 1
+                best = self.heavier(best, tree[hi])
+            lo >>= 1
+            hi >>= 1
+        return best
+
+    def heavier(self, i, j):
+        if i is None:
+            return j
+        weights = self.key_weights
+        if weights[j] > weights[i] or (weights[j] == weights[i] and j < i):
+            return j
+        return i
+
+    def push_range(self, heap, lo, hi):
+        if lo < hi:
+            i = self.heaviest(lo, hi)
+            heapq.heappush(heap, (-self.key_weights[i], i, -1, None, (lo, hi)))
+
+    def best(self, name):
+        """
+        Disambiguates a name without prompting, returning the id of the
+        person with that name who starred in the most movies, or None.
+        """
+        person_ids = self.names.get(name.lower())
+        if not person_ids:
+            return None
+        return max(person_ids, key=self.weight)
+
+    def variants(self, name):
+        """
+        Returns every string one deletion, transposition, substitution or
+        insertion away from name, over the index's alphabet plus the
+        characters of name itself.
+        """
+        letters = set(self.alphabet) | set(name)
+        variants = set()
+        for i in range(len(name) + 1):
+            left, right = name[:i], name[i:]
+            if right:
+                variants.add(left + right[1:])
+                if len(right) > 1:
+                    variants.add(left + right[1] + right[0] + right[2:])
+                for c in letters:
+                    variants.add(left + c + right[1:])
+            for c in letters:
+                variants.add(left + c + right)
+        variants.discard(name)
+        return variants
+
+    def fuzzy(self, name, k=10):
+        """
+        Returns up to k (person_id, distance) pairs for names within one
+        typo of name, exact matches first and then most movies first.
+        """
+        name = name.lower()
+        matches = [(0, -self.weight(person_id), person_id)
+                   for person_id in self.names.get(name, ())]
+        for variant in self.variants(name):
+            for person_id in self.names.get(variant, ()):
+                matches.append((1, -self.weight(person_id), person_id))
+        return [(person_id, distance)
+                for distance, _, person_id in heapq.nsmallest(k, matches)]
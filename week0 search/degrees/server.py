@@ -0,0 +1,332 @@
+"""
+Long-running degrees query server.
+
+Loads the data once and answers newline-delimited JSON requests on a
+localhost socket. Each request is an object such as
+
+    {"id": 1, "method": "shortest_path", "timeout": 2.0,
+     "params": {"source": "Kevin Bacon", "target": "Tom Hanks"}}
+
+and gets back one JSON line with the same id and either a "result" or an
+"error". Requests on one connection are answered concurrently, so
+responses may arrive out of order. Methods:
+
+    shortest_path  source and target person ids or names, optional engine
+    resolve        name and optional k; people with that name or within
+                   one typo of it, most prolific first
+    cancel         id of an earlier request on the same connection
+    stats          request counts and latencies per method
+
+Searches run in a pool of forked worker processes that share the loaded
+graph. A request still running when its timeout expires is answered with
+an error straight away; if it has not started yet it is dropped from the
+pool's queue.
+
+Usage: python server.py [directory] [--port PORT] [--workers N] [--compact]
+"""
+import argparse
+import asyncio
+import json
+import multiprocessing
+import os
+import sys
+import time
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+
+import degrees
+
+
+class RequestError(Exception):
+    """
+    Raised by a handler to answer a request with an error message.
+    """
+
+
+class LatencyCounters():
+    """
+    Request counts and latencies of one method, keeping the most recent
+    latencies for percentiles.
+    """
+
+    def __init__(self, recent=1000):
+        self.count = 0
+        self.errors = 0
+        self.timeouts = 0
+        self.total = 0.0
+        self.max = 0.0
+        self.recent = deque(maxlen=recent)
+
+    def record(self, seconds, outcome):
+        self.count += 1
+        if outcome == "error":
+            self.errors += 1
+        elif outcome == "timeout":
+            self.timeouts += 1
+        self.total += seconds
+        self.max = max(self.max, seconds)
+        self.recent.append(seconds)
+
+    def summary(self):
+        recent = sorted(self.recent)
+
+        def at(fraction):
+            if not recent:
+                return None
+            return recent[min(len(recent) - 1, int(fraction * len(recent)))]
+
+        return {
+            "count": self.count,
+            "errors": self.errors,
+            "timeouts": self.timeouts,
+            "mean_seconds": self.total / self.count if self.count else None,
+            "max_seconds": self.max,
+            "p50_seconds": at(0.50),
+            "p99_seconds": at(0.99),
+        }
+
+
+def check_id(request_id):
+    """
+    Raises ValueError unless request_id can key a pending request: a
+    string, an integer or null.
+    """
+    if request_id is not None and (
+        isinstance(request_id, bool) or not isinstance(request_id, (str, int))
+    ):
+        raise ValueError("id must be a string, an integer or null")
+
+
+def request_params(request):
+    """
+    Returns the params object of a request, which defaults to empty.
+    """
+    params = request.get("params")
+    if params is None:
+        return {}
+    if not isinstance(params, dict):
+        raise RequestError("params must be a JSON object")
+    return params
+
+
+def search_worker(engine, source, target, deadline):
+    """
+    Runs one search in a worker process, skipping it if its deadline
+    passed while it waited in the queue.
+    """
+    if time.time() > deadline:
+        return None, False
+    return degrees.ENGINES[engine](source, target), True
+
+
+class QueryServer():
+
+    def __init__(self, executor, engine="bidirectional", timeout=10.0):
+        self.executor = executor
+        self.engine = engine
+        self.timeout = timeout
+        self.counters = {}
+        self.handlers = {
+            "shortest_path": self.shortest_path,
+            "resolve": self.resolve,
+            "stats": self.stats,
+        }
+
+    async def handle_connection(self, reader, writer):
+        """
+        Reads requests until the client closes its end, answering each in
+        its own task, then waits for outstanding answers.
+        """
+        pending = {}
+        tasks = set()
+        lock = asyncio.Lock()
+        try:
+            while line := await reader.readline():
+                try:
+                    request = json.loads(line)
+                    if not isinstance(request, dict):
+                        raise ValueError("request must be a JSON object")
+                    check_id(request.get("id"))
+                except ValueError as e:
+                    await self.send(writer, lock, {"error": f"bad request: {e}"})
+                    continue
+
+                if request.get("method") == "cancel":
+                    try:
+                        params = request_params(request)
+                        check_id(params.get("id"))
+                    except (RequestError, ValueError) as e:
+                        await self.send(writer, lock, {
+                            "id": request.get("id"), "error": f"bad request: {e}"
+                        })
+                        continue
+                    task = pending.get(params.get("id"))
+                    if task is not None:
+                        task.cancel()
+                    await self.send(writer, lock, {
+                        "id": request.get("id"), "result": task is not None
+                    })
+                    continue
+
+                task = asyncio.create_task(self.answer(request, writer, lock))
+                tasks.add(task)
+                task.add_done_callback(tasks.discard)
+                if "id" in request:
+                    # A later request may reuse the id; only drop our own
+                    pending[request["id"]] = task
+
+                    def forget(task, key=request["id"]):
+                        if pending.get(key) is task:
+                            del pending[key]
+
+                    task.add_done_callback(forget)
+            await asyncio.gather(*tasks, return_exceptions=True)
+        except ConnectionError:
+            for task in list(tasks):
+                task.cancel()
+        finally:
+            writer.close()
+
+    async def answer(self, request, writer, lock):
+        """
+        Runs the handler for one request, timing it, and sends the answer.
+        """
+        method = request.get("method")
+        response = {"id": request.get("id")}
+        start = time.perf_counter()
+        outcome = "ok"
+        try:
+            handler = self.handlers.get(method)
+            if handler is None:
+                raise RequestError(f"unknown method {method!r}")
+            timeout = float(request.get("timeout", self.timeout))
+            params = request_params(request)
+            response["result"] = await asyncio.wait_for(
+                handler(params, timeout), timeout
+            )
+        except asyncio.TimeoutError:
+            outcome = "timeout"
+            response["error"] = "deadline exceeded"
+        except asyncio.CancelledError:
+            outcome = "error"
+            response["error"] = "cancelled"
+        except (RequestError, ValueError, TypeError) as e:
+            outcome = "error"
+            response["error"] = str(e)
+        except Exception as e:
+            # Worker failures such as a broken pool still get an answer
+            outcome = "error"
+            response["error"] = f"internal error: {type(e).__name__}: {e}"
+        if method in self.handlers:
+            counters = self.counters.setdefault(method, LatencyCounters())
+            counters.record(time.perf_counter() - start, outcome)
+        await self.send(writer, lock, response)
+
+    async def send(self, writer, lock, response):
+        async with lock:
+            writer.write(json.dumps(response).encode("utf-8") + b"\n")
+            await writer.drain()
+
+    async def shortest_path(self, params, timeout):
+        source = self.person(params, "source")
+        target = self.person(params, "target")
+        engine = params.get("engine", self.engine)
+        if engine not in degrees.ENGINES:
+            raise RequestError(f"unknown engine {engine!r}")
+
+        loop = asyncio.get_running_loop()
+        path, ran = await loop.run_in_executor(
+            self.executor, search_worker, engine, source, target,
+            time.time() + timeout
+        )
+        if not ran:
+            raise asyncio.TimeoutError()
+        if path is None:
+            return {"source": source, "target": target, "degrees": None,
+                    "path": None}
+        return {
+            "source": source,
+            "target": target,
+            "degrees": len(path),
+            "path": [
+                {
+                    "movie_id": movie_id,
+                    "title": degrees.movies[movie_id]["title"],
+                    "person_id": person_id,
+                    "name": degrees.people[person_id]["name"],
+                }
+                for movie_id, person_id in path
+            ],
+        }
+
+    def person(self, params, key):
+        text = params.get(key)
+        if not isinstance(text, str):
+            raise RequestError(f"missing {key}")
+        person_id = degrees.resolve_person(text)
+        if person_id is None:
+            raise RequestError(f"{key} {text!r} not found")
+        return person_id
+
+    async def resolve(self, params, timeout):
+        name = params.get("name")
+        if not isinstance(name, str):
+            raise RequestError("missing name")
+        k = int(params.get("k", 5))
+        matches = degrees.name_index.fuzzy(name, k)
+        return [
+            {
+                "person_id": person_id,
+                "name": degrees.people[person_id]["name"],
+                "birth": degrees.people[person_id]["birth"],
+                "movies": degrees.movie_count(person_id),
+                "typos": distance,
+            }
+            for person_id, distance in matches
+        ]
+
+    async def stats(self, params, timeout):
+        return {method: counters.summary()
+                for method, counters in self.counters.items()}
+
+
+async def serve(server, host, port):
+    listener = await asyncio.start_server(server.handle_connection, host, port)
+    address = listener.sockets[0].getsockname()
+    print(f"Serving on {address[0]}:{address[1]}", file=sys.stderr)
+    async with listener:
+        await listener.serve_forever()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Degrees query server.")
+    parser.add_argument("directory", nargs="?", default="large")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=5050)
+    parser.add_argument("--workers", type=int, default=os.cpu_count())
+    parser.add_argument("--engine", choices=sorted(degrees.ENGINES),
+                        default="bidirectional")
+    parser.add_argument("--timeout", type=float, default=10.0,
+                        help="default request timeout in seconds")
+    parser.add_argument("--compact", action="store_true",
+                        help="load the graph as integer-indexed CSR arrays")
+    args = parser.parse_args()
+
+    print("Loading data...", file=sys.stderr)
+    degrees.load_data(args.directory, compact=args.compact)
+    print("Data loaded.", file=sys.stderr)
+
+    # Fork every worker now, sharing the graph copy-on-write. Forking on
+    # the first search would hand the workers the sockets open by then.
+    context = multiprocessing.get_context("fork")
+    with ProcessPoolExecutor(args.workers, mp_context=context) as executor:
+        executor.submit(int).result()
+        server = QueryServer(executor, args.engine, args.timeout)
+        try:
+            asyncio.run(serve(server, args.host, args.port))
+        except KeyboardInterrupt:
+            pass
+
+
+if __name__ == "__main__":
+    main()
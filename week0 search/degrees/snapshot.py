@@ -0,0 +1,193 @@
+"""
+Binary snapshot of a compact degrees dataset.
+
+A snapshot stores the StarGraph CSR arrays together with string tables
+for person and movie metadata, laid out so that it can be memory-mapped
+and used straight away instead of re-parsing the CSV files. It records
+the size and mtime of each CSV file and is ignored once any of them
+changes.
+"""
+import mmap
+import os
+import struct
+from array import array
+from collections.abc import Mapping, Sequence
+
+from graph import StarGraph
+
+MAGIC = b"DEGSNAP1"
+FILENAME = "degrees.snapshot"
+CSV_FILES = ("people.csv", "movies.csv", "stars.csv")
+PERSON_FIELDS = ("name", "birth")
+MOVIE_FIELDS = ("title", "year")
+
+# Magic, (size, mtime_ns) of each CSV file, number of sections
+HEADER = struct.Struct(f"<8s{2 * len(CSV_FILES)}qI")
+
+# Byte offset and length of one section
+SECTION = struct.Struct("<qq")
+
+
+class StringTable(Sequence):
+    """
+    Read-only sequence of strings stored as one UTF-8 blob plus an array
+    of offsets, where string i is data[offsets[i]:offsets[i + 1]].
+    """
+
+    def __init__(self, offsets, data):
+        self.offsets = offsets
+        self.data = data
+
+    @classmethod
+    def build(cls, strings):
+        """
+        Encodes a sequence of strings, returning the offsets array and
+        the data blob.
+        """
+        offsets = array("q", [0])
+        data = bytearray()
+        for s in strings:
+            data += s.encode("utf-8")
+            offsets.append(len(data))
+        return offsets, data
+
+    def __len__(self):
+        return len(self.offsets) - 1
+
+    def __getitem__(self, i):
+        if isinstance(i, slice):
+            return [self[j] for j in range(*i.indices(len(self)))]
+        if i < 0:
+            i += len(self)
+        return str(self.data[self.offsets[i]:self.offsets[i + 1]], "utf-8")
+
+
+class Records(Mapping):
+    """
+    Read-only mapping from ids to metadata dictionaries, such as
+    {"name": ..., "birth": ...}, backed by string table columns.
+    """
+
+    def __init__(self, ids, index, columns):
+        self.ids = ids
+        self.index = index
+        self.columns = columns
+
+    def column(self, field):
+        """
+        Returns one field of every record, in id index order.
+        """
+        return self.columns[field]
+
+    def __getitem__(self, key):
+        i = self.index[key]
+        return {field: column[i] for field, column in self.columns.items()}
+
+    def __iter__(self):
+        return iter(self.ids)
+
+    def __len__(self):
+        return len(self.ids)
+
+    def __contains__(self, key):
+        return key in self.index
+
+
+def snapshot_path(directory):
+    return os.path.join(directory, FILENAME)
+
+
+def fingerprint(directory):
+    """
+    Returns the (size, mtime_ns) pairs of the CSV files, flattened.
+    """
+    values = []
+    for filename in CSV_FILES:
+        stat = os.stat(os.path.join(directory, filename))
+        values.extend((stat.st_size, stat.st_mtime_ns))
+    return tuple(values)
+
+
+def save(directory, graph, people, movies):
+    """
+    Writes a snapshot of graph and its metadata next to the CSV files.
+    people and movies must provide column(field), like Records and
+    ingest.CsvRecords.
+    """
+    sections = [
+        graph.person_offsets, graph.person_movies,
+        graph.movie_offsets, graph.movie_people,
+    ]
+    for ids, records, fields in ((graph.person_ids, people, PERSON_FIELDS),
+                                 (graph.movie_ids, movies, MOVIE_FIELDS)):
+        sections.extend(StringTable.build(ids))
+        for field in fields:
+            sections.extend(StringTable.build(records.column(field)))
+
+    # Lay out every section at an 8-byte aligned offset
+    table = []
+    position = HEADER.size + SECTION.size * len(sections)
+    for section in sections:
+        position += -position % 8
+        length = memoryview(section).nbytes
+        table.append((position, length))
+        position += length
+
+    path = snapshot_path(directory)
+    temporary = f"{path}.{os.getpid()}.tmp"
+    with open(temporary, "wb") as f:
+        f.write(HEADER.pack(MAGIC, *fingerprint(directory), len(sections)))
+        for entry in table:
+            f.write(SECTION.pack(*entry))
+        for (offset, _), section in zip(table, sections):
+            f.write(bytes(offset - f.tell()))
+            f.write(section)
+    os.replace(temporary, path)
+
+
+def load(directory):
+    """
+    Maps the snapshot of directory into memory.
+
+    Returns (graph, people, movies), or None if there is no snapshot or
+    it is out of date with the CSV files.
+    """
+    path = snapshot_path(directory)
+    try:
+        with open(path, "rb") as f:
+            buffer = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+    except (OSError, ValueError):
+        return None
+
+    view = memoryview(buffer)
+    if len(view) < HEADER.size:
+        return None
+    magic, *stamp, count = HEADER.unpack_from(view)
+    if magic != MAGIC or tuple(stamp) != fingerprint(directory):
+        return None
+
+    sections = []
+    for i in range(count):
+        offset, length = SECTION.unpack_from(view, HEADER.size + i * SECTION.size)
+        sections.append(view[offset:offset + length])
+    sections.reverse()
+
+    def take(typecode):
+        return sections.pop().cast(typecode)
+
+    def take_strings():
+        offsets = take("q")
+        return StringTable(offsets, sections.pop())
+
+    person_offsets, person_movies = take("q"), take("i")
+    movie_offsets, movie_people = take("q"), take("i")
+    person_ids = take_strings()
+    person_columns = {field: take_strings() for field in PERSON_FIELDS}
+    movie_ids = take_strings()
+    movie_columns = {field: take_strings() for field in MOVIE_FIELDS}
+
+    graph = StarGraph(person_ids, movie_ids, person_offsets, person_movies,
+                      movie_offsets, movie_people)
+    people = Records(person_ids, graph.person_index, person_columns)
+    movies = Records(movie_ids, graph.movie_index, movie_columns)
+    return graph, people, movies
@@ -1,3 +1,6 @@
+from collections import deque
+
+
 class Node():
     def __init__(self, state, parent, action):
         self.state = state
@@ -40,3 +43,79 @@ class QueueFrontier(StackFrontier):
             node = self.frontier[0]
             self.frontier = self.frontier[1:]
             return node
+
+
+class ExploredSet():
+    """
+    Hash set of states that a search has already expanded.
+    """
+    def __init__(self):
+        self.states = set()
+
+    def add(self, state):
+        self.states.add(state)
+
+    def contains_state(self, state):
+        return state in self.states
+
+    def __len__(self):
+        return len(self.states)
+
+
+class IndexedStackFrontier():
+    """
+    Stack frontier backed by a deque, with a hash index of the states it
+    holds so that remove and contains_state take constant time.
+
+    Removed nodes are recorded in `explored`. With dedupe=True, add skips
+    nodes whose state is already in the frontier or already explored.
+    """
+    def __init__(self, dedupe=False):
+        self.frontier = deque()
+        self.index = {}
+        self.explored = ExploredSet()
+        self.dedupe = dedupe
+
+    def add(self, node):
+        """
+        Adds node to the frontier, returning whether it was added.
+        """
+        if self.dedupe and (node.state in self.index
+                            or self.explored.contains_state(node.state)):
+            return False
+        self.frontier.append(node)
+        self.index.setdefault(node.state, deque()).append(node)
+        return True
+
+    def contains_state(self, state):
+        nodes = self.index.get(state)
+        return nodes[0] if nodes else None
+
+    def empty(self):
+        return len(self.frontier) == 0
+
+    def remove(self):
+        if self.empty():
+            raise Exception("empty frontier")
+        node = self.pop()
+        if not self.index[node.state]:
+            del self.index[node.state]
+        self.explored.add(node.state)
+        return node
+
+    def pop(self):
+        """
+        Takes the next node off the frontier and off its state's nodes in
+        the index, which are kept in the same order.
+        """
+        node = self.frontier.pop()
+        self.index[node.state].pop()
+        return node
+
+
+class IndexedQueueFrontier(IndexedStackFrontier):
+
+    def pop(self):
+        node = self.frontier.popleft()
+        self.index[node.state].popleft()
+        return node
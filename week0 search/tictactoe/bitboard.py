@@ -0,0 +1,202 @@
+"""
+Tic Tac Toe Player on bitboards.
+
+Has the same interface as tictactoe.py and works on the same nested list
+boards, so runner.py can use either. Internally each position is a pair
+of 9-bit masks, one per player, where cell (i, j) is bit 3 * i + j.
+"""
+
+X = "X"
+O = "O"
+EMPTY = None
+
+# Mask with every cell set
+FULL = (1 << 9) - 1
+
+# Masks of the three rows, three columns and two diagonals
+LINES = tuple(
+    [sum(1 << (3 * i + j) for j in range(3)) for i in range(3)]
+    + [sum(1 << (3 * i + j) for i in range(3)) for j in range(3)]
+    + [sum(1 << (4 * i) for i in range(3)),
+       sum(1 << (2 * i + 2) for i in range(3))]
+)
+
+# WINNING[mask] is 1 if mask covers a whole line
+WINNING = bytes(
+    any(mask & line == line for line in LINES) for mask in range(FULL + 1)
+)
+
+# COUNT[mask] is the number of cells set in mask
+COUNT = bytes(bin(mask).count("1") for mask in range(FULL + 1))
+
+# Cells in the order moves are tried: center, corners, then edges
+MOVE_ORDER = (4, 0, 2, 6, 8, 1, 3, 5, 7)
+
+# Minimax value of every position searched so far, keyed by x << 9 | o
+table = {}
+
+
+def initial_state():
+    """
+    Returns starting state of the board.
+    """
+    return [[EMPTY, EMPTY, EMPTY] for i in range(3)]
+
+
+def encode(board):
+    """
+    Returns the (x, o) masks of a nested list board.
+    """
+    x = o = 0
+    for i, row in enumerate(board):
+        for j, value in enumerate(row):
+            if value == X:
+                x |= 1 << (3 * i + j)
+            elif value == O:
+                o |= 1 << (3 * i + j)
+    return x, o
+
+
+def decode(x, o):
+    """
+    Returns the nested list board of a pair of masks.
+    """
+    return [
+        [X if x >> (3 * i + j) & 1 else O if o >> (3 * i + j) & 1 else EMPTY
+         for j in range(3)]
+        for i in range(3)
+    ]
+
+
+def player(board):
+    """
+    Returns player who has the next turn on a board.
+    """
+    x, o = encode(board)
+    return X if COUNT[x] == COUNT[o] else O
+
+
+def actions(board):
+    """
+    Returns a list of all possible actions (i, j) available on the board.
+    """
+    x, o = encode(board)
+    empty = FULL & ~(x | o)
+    return [divmod(cell, 3) for cell in range(9) if empty >> cell & 1]
+
+
+def result(board, action):
+    """
+    Returns the board that results from making move (i, j) on the board.
+    """
+    i, j = action
+    if not (0 <= i < 3 and 0 <= j < 3):
+        raise ValueError(f"invalid action {action}")
+    x, o = encode(board)
+    bit = 1 << (3 * i + j)
+    if (x | o) & bit:
+        raise ValueError(f"invalid action {action}")
+    if COUNT[x] == COUNT[o]:
+        return decode(x | bit, o)
+    return decode(x, o | bit)
+
+
+def winner(board):
+    """
+    Returns the winner of the game, if there is one.
+    """
+    x, o = encode(board)
+    if WINNING[x]:
+        return X
+    if WINNING[o]:
+        return O
+    return None
+
+
+def terminal(board):
+    """
+    Returns True if game is over, False otherwise.
+    """
+    x, o = encode(board)
+    return bool(WINNING[x] or WINNING[o] or x | o == FULL)
+
+
+def utility(board):
+    """
+    Returns 1 if X has won the game, -1 if O has won, 0 otherwise.
+    """
+    x, o = encode(board)
+    return WINNING[x] - WINNING[o]
+
+
+def minimax(board):
+    """
+    Returns the optimal action for the current player on the board.
+    """
+    x, o = encode(board)
+    cell = best_move(x, o)
+    return None if cell is None else divmod(cell, 3)
+
+
+def value(x, o):
+    """
+    Returns the minimax value of a position: 1 if X wins with best play,
+    -1 if O does, 0 for a tie. Values are memoized in the transposition
+    table, so each position is only ever searched once.
+    """
+    key = x << 9 | o
+    known = table.get(key)
+    if known is not None:
+        return known
+
+    if WINNING[x]:
+        score = 1
+    elif WINNING[o]:
+        score = -1
+    elif x | o == FULL:
+        score = 0
+    else:
+        empty = FULL & ~(x | o)
+        if COUNT[x] == COUNT[o]:
+            score = -1
+            for cell in MOVE_ORDER:
+                bit = 1 << cell
+                if empty & bit:
+                    score = max(score, value(x | bit, o))
+                    if score == 1:
+                        break
+        else:
+            score = 1
+            for cell in MOVE_ORDER:
+                bit = 1 << cell
+                if empty & bit:
+                    score = min(score, value(x, o | bit))
+                    if score == -1:
+                        break
+    table[key] = score
+    return score
+
+
+def best_move(x, o):
+    """
+    Returns the cell of an optimal move for the player to move, or None
+    if the game is over. Ties go to the first cell in MOVE_ORDER.
+    """
+    if WINNING[x] or WINNING[o] or x | o == FULL:
+        return None
+
+    empty = FULL & ~(x | o)
+    x_to_move = COUNT[x] == COUNT[o]
+    best = None
+    best_score = None
+    for cell in MOVE_ORDER:
+        bit = 1 << cell
+        if not empty & bit:
+            continue
+        if x_to_move:
+            score = value(x | bit, o)
+        else:
+            score = -value(x, o | bit)
+        if best_score is None or score > best_score:
+            best, best_score = cell, score
+    return best
@@ -0,0 +1,223 @@
+"""
+Opening book holding the solved value and best moves of every tic tac toe
+position, up to the 8 symmetries of the board.
+
+Positions that are rotations or reflections of each other share one
+entry, keyed by their canonical form, leaving 765 entries. The book is
+stored in book.bin and loaded when this module is imported.
+
+Usage: python book.py [--verify]
+    Rebuilds book.bin from a full solve and verifies it, or with
+    --verify only checks the existing file.
+"""
+import argparse
+import os
+import struct
+import sys
+
+import bitboard
+
+MAGIC = b"TTTBOOK1"
+FILENAME = os.path.join(os.path.dirname(os.path.abspath(__file__)), "book.bin")
+
+# Magic and number of entries
+HEADER = struct.Struct("<8sI")
+
+# Canonical position (x << 9 | o), value for X, mask of best moves
+ENTRY = struct.Struct("<IbH")
+
+# Number of distinct positions up to symmetry
+POSITIONS = 765
+
+
+def symmetries():
+    """
+    Returns the 8 symmetries of the board as tuples mapping each cell to
+    the cell it moves to.
+    """
+    def rotate(i, j):
+        return j, 2 - i
+
+    def reflect(i, j):
+        return i, 2 - j
+
+    result = []
+    for reflected in (False, True):
+        for turns in range(4):
+            permutation = []
+            for cell in range(9):
+                i, j = divmod(cell, 3)
+                if reflected:
+                    i, j = reflect(i, j)
+                for _ in range(turns):
+                    i, j = rotate(i, j)
+                permutation.append(3 * i + j)
+            result.append(tuple(permutation))
+    return result
+
+
+SYMMETRIES = symmetries()
+
+# TRANSFORMS[k][mask] is mask with every cell moved by symmetry k
+TRANSFORMS = [
+    [sum(1 << permutation[cell] for cell in range(9) if mask >> cell & 1)
+     for mask in range(bitboard.FULL + 1)]
+    for permutation in SYMMETRIES
+]
+
+
+def canonical(x, o):
+    """
+    Returns (key, k): the smallest x << 9 | o over every symmetry of the
+    position, and the index of a symmetry that produces it.
+    """
+    return min((transform[x] << 9 | transform[o], k)
+               for k, transform in enumerate(TRANSFORMS))
+
+
+def solve():
+    """
+    Solves every reachable position, returning a dict from canonical
+    keys to (value, mask of best moves) in the canonical orientation.
+    """
+    entries = {}
+    stack = [(0, 0)]
+    while stack:
+        x, o = stack.pop()
+        key, _ = canonical(x, o)
+        if key in entries:
+            continue
+        x, o = key >> 9, key & bitboard.FULL
+        value = bitboard.value(x, o)
+
+        moves = 0
+        if not (bitboard.WINNING[x] or bitboard.WINNING[o]):
+            empty = bitboard.FULL & ~(x | o)
+            x_to_move = bitboard.COUNT[x] == bitboard.COUNT[o]
+            for cell in range(9):
+                bit = 1 << cell
+                if not empty & bit:
+                    continue
+                child = (x | bit, o) if x_to_move else (x, o | bit)
+                if bitboard.value(*child) == value:
+                    moves |= bit
+                stack.append(child)
+        entries[key] = (value, moves)
+    return entries
+
+
+def save(entries, path=FILENAME):
+    with open(path, "wb") as f:
+        f.write(HEADER.pack(MAGIC, len(entries)))
+        for key in sorted(entries):
+            f.write(ENTRY.pack(key, *entries[key]))
+
+
+def load(path=FILENAME):
+    """
+    Reads a book file, returning its entries, or None if it is missing
+    or not a book.
+    """
+    try:
+        with open(path, "rb") as f:
+            data = f.read()
+    except OSError:
+        return None
+    if len(data) < HEADER.size:
+        return None
+    magic, count = HEADER.unpack_from(data)
+    if magic != MAGIC or len(data) != HEADER.size + count * ENTRY.size:
+        return None
+    return {key: (value, moves)
+            for key, value, moves in ENTRY.iter_unpack(data[HEADER.size:])}
+
+
+# Entries of book.bin, or None if it has not been built
+entries = load()
+
+
+def lookup(board):
+    """
+    Returns (value, moves) for a nested list board: its value for X and
+    the list of its best moves (i, j), or None if there is no book or the
+    position is not in it.
+    """
+    if entries is None:
+        return None
+    x, o = bitboard.encode(board)
+    key, k = canonical(x, o)
+    if key not in entries:
+        return None
+    value, canonical_moves = entries[key]
+    permutation = SYMMETRIES[k]
+    moves = [divmod(cell, 3) for cell in range(9)
+             if canonical_moves >> permutation[cell] & 1]
+    return value, moves
+
+
+def verify(entries):
+    """
+    Checks entries against a fresh solve and against every reachable
+    position, returning a list of problems found.
+    """
+    problems = []
+    if len(entries) != POSITIONS:
+        problems.append(f"{len(entries)} entries, expected {POSITIONS}")
+    if entries != solve():
+        problems.append("entries differ from a fresh solve")
+
+    stack = [(0, 0)]
+    seen = set()
+    while stack:
+        x, o = stack.pop()
+        if (x, o) in seen:
+            continue
+        seen.add((x, o))
+        key, k = canonical(x, o)
+        if key not in entries:
+            problems.append(f"no entry for position {x:03x} {o:03x}")
+            continue
+        value, moves = entries[key]
+        if value != bitboard.value(x, o):
+            problems.append(f"wrong value for position {x:03x} {o:03x}")
+        if bitboard.terminal(bitboard.decode(x, o)):
+            continue
+
+        empty = bitboard.FULL & ~(x | o)
+        x_to_move = bitboard.COUNT[x] == bitboard.COUNT[o]
+        for cell in range(9):
+            bit = 1 << cell
+            if not empty & bit:
+                continue
+            child = (x | bit, o) if x_to_move else (x, o | bit)
+            best = bitboard.value(*child) == value
+            if best != bool(moves >> SYMMETRIES[k][cell] & 1):
+                problems.append(f"wrong best moves for position {x:03x} {o:03x}")
+                break
+            stack.append(child)
+    return problems
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Build the opening book.")
+    parser.add_argument("--verify", action="store_true",
+                        help="only verify the existing book")
+    args = parser.parse_args()
+
+    if not args.verify:
+        save(solve())
+    book = load()
+    if book is None:
+        sys.exit(f"Could not read {FILENAME}")
+
+    problems = verify(book)
+    for problem in problems:
+        print(problem)
+    if problems:
+        sys.exit(1)
+    print(f"{FILENAME}: {len(book)} positions verified, "
+          f"{os.path.getsize(FILENAME)} bytes.")
+
+
+if __name__ == "__main__":
+    main()
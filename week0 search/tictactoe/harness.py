@@ -0,0 +1,276 @@
+"""
+Perft and self-play harness for the tic tac toe engines in this directory.
+
+perft walks the game tree with an engine's actions, result and terminal
+functions, counting positions at each depth, and compares the counts to
+the bitboard engine's. match plays timed games between two engines,
+checks every move against a full solve of the game, and reports per-move
+latency percentiles and, for engines that count them, nodes per second.
+
+Usage: python harness.py perft [ENGINE ...] [--depth N]
+       python harness.py match ENGINE ENGINE [--games N] [--random-plies N]
+
+tictactoe1 runs a full game tree enumeration when it is imported, taking
+several seconds, and its minimax cannot be called, so it is left out
+unless named.
+"""
+import argparse
+import contextlib
+import importlib.util
+import io
+import os
+import random
+import sys
+import time
+
+import bitboard
+
+DIRECTORY = os.path.dirname(os.path.abspath(__file__))
+
+# Engine names and the files they are loaded from
+ENGINES = {
+    "tictactoe": "tictactoe.py",
+    "tictactoe1": "tictactoe1.py",
+    "2nd": os.path.join("2nd", "tictactoe.py"),
+    "first-try": os.path.join("first try", "tictactoe.py"),
+    "bitboard": "bitboard.py",
+    "mnk": "mnk.py",
+}
+DEFAULT_ENGINES = [name for name in ENGINES if name != "tictactoe1"]
+
+modules = {}
+
+
+def load_engine(name):
+    """
+    Imports an engine from its file under a name of its own, so engines
+    in different directories with the same file name do not clash. Output
+    printed while importing is discarded.
+    """
+    if name not in modules:
+        path = os.path.join(DIRECTORY, ENGINES[name])
+        spec = importlib.util.spec_from_file_location(f"engine_{name}", path)
+        module = importlib.util.module_from_spec(spec)
+        with contextlib.redirect_stdout(io.StringIO()):
+            spec.loader.exec_module(module)
+        modules[name] = module
+    return modules[name]
+
+
+def perft(engine, depth):
+    """
+    Returns the number of positions at each depth from 1 to depth,
+    stopping at finished games, using the engine's own move generation.
+    """
+    counts = [0] * depth
+
+    def walk(board, ply):
+        if ply == depth or engine.terminal(board):
+            return
+        for action in engine.actions(board):
+            counts[ply] += 1
+            walk(engine.result(board, action), ply + 1)
+
+    walk(engine.initial_state(), 0)
+    return counts
+
+
+def percentiles(samples):
+    """
+    Summarizes latencies in seconds as count, mean and percentiles.
+    """
+    samples = sorted(samples)
+    if not samples:
+        return {"count": 0}
+
+    def at(fraction):
+        return samples[min(len(samples) - 1, int(fraction * len(samples)))]
+
+    return {
+        "count": len(samples),
+        "mean": sum(samples) / len(samples),
+        "p50": at(0.50),
+        "p90": at(0.90),
+        "p99": at(0.99),
+        "max": samples[-1],
+    }
+
+
+class Stats():
+    """
+    Move statistics of one engine over a match.
+    """
+
+    def __init__(self):
+        self.latencies = []
+        self.nodes = 0
+        self.optimal = 0
+        self.suboptimal = 0
+        self.errors = 0
+        self.wins = 0
+        self.losses = 0
+        self.draws = 0
+
+    def nodes_per_second(self):
+        if not self.nodes:
+            return None
+        return self.nodes / sum(self.latencies)
+
+
+def is_optimal(board, move):
+    """
+    Returns True if move keeps the solved value of the position.
+    """
+    x, o = bitboard.encode(board)
+    after = bitboard.encode(bitboard.result(board, move))
+    return bitboard.value(*after) == bitboard.value(x, o)
+
+
+def play(engines, stats, opening):
+    """
+    Plays one game from the opening moves between engines, a dict from
+    bitboard.X and bitboard.O to modules, recording each engine's moves
+    in stats. Returns the winner, None for a tie, or the player whose
+    engine failed to return a legal move.
+    """
+    board = bitboard.initial_state()
+    for move in opening:
+        board = bitboard.result(board, move)
+
+    while not bitboard.terminal(board):
+        turn = bitboard.player(board)
+        engine, record = engines[turn], stats[turn]
+        if hasattr(engine, "nodes"):
+            engine.nodes = 0
+        start = time.perf_counter()
+        try:
+            with contextlib.redirect_stdout(io.StringIO()):
+                move = engine.minimax([row[:] for row in board])
+            if move not in bitboard.actions(board):
+                raise ValueError(f"illegal move {move}")
+        except Exception as e:
+            record.errors += 1
+            print(f"{turn} engine failed: {e!r}", file=sys.stderr)
+            return bitboard.O if turn == bitboard.X else bitboard.X
+        record.latencies.append(time.perf_counter() - start)
+        if hasattr(engine, "nodes"):
+            record.nodes += engine.nodes
+
+        if is_optimal(board, move):
+            record.optimal += 1
+        else:
+            record.suboptimal += 1
+        board = bitboard.result(board, move)
+    return bitboard.winner(board)
+
+
+def random_opening(rng, plies):
+    """
+    Returns a list of up to plies random moves that do not end the game.
+    """
+    board = bitboard.initial_state()
+    opening = []
+    for _ in range(plies):
+        moves = bitboard.actions(board)
+        move = rng.choice(moves)
+        if bitboard.terminal(bitboard.result(board, move)):
+            break
+        opening.append(move)
+        board = bitboard.result(board, move)
+    return opening
+
+
+def match(first, second, games, random_plies, seed):
+    """
+    Plays games between two engines, alternating who plays X, and
+    returns the Stats of each.
+    """
+    rng = random.Random(seed)
+    engines = {first: load_engine(first), second: load_engine(second)}
+    stats = {first: Stats(), second: Stats()}
+    if first == second:
+        # An engine playing itself shares one set of statistics
+        stats[second] = stats[first]
+
+    for game in range(games):
+        x_name, o_name = (first, second) if game % 2 == 0 else (second, first)
+        opening = random_opening(rng, random_plies)
+        winner = play({bitboard.X: engines[x_name], bitboard.O: engines[o_name]},
+                      {bitboard.X: stats[x_name], bitboard.O: stats[o_name]},
+                      opening)
+        if winner is None:
+            stats[x_name].draws += 1
+            stats[o_name].draws += 1
+        else:
+            winning, losing = ((x_name, o_name) if winner == bitboard.X
+                               else (o_name, x_name))
+            stats[winning].wins += 1
+            stats[losing].losses += 1
+        print(f"Game {game + 1}: {x_name} (X) vs {o_name} (O), "
+              f"opening {opening}: {winner or 'tie'}", file=sys.stderr)
+    return stats
+
+
+def run_perft(names, depth):
+    expected = perft(bitboard, depth)
+    print(f"{'depth':>10}" + "".join(f"{d:>9}" for d in range(1, depth + 1)))
+    for name in names:
+        engine = load_engine(name)
+        start = time.perf_counter()
+        counts = perft(engine, depth)
+        elapsed = time.perf_counter() - start
+        status = "ok" if counts == expected else "MISMATCH"
+        print(f"{name:>10}" + "".join(f"{c:>9}" for c in counts)
+              + f"  {sum(counts) / elapsed:,.0f} nodes/s {status}")
+
+
+def run_match(first, second, games, random_plies, seed):
+    stats = match(first, second, games, random_plies, seed)
+    for name in dict.fromkeys((first, second)):
+        record = stats[name]
+        latency = percentiles(record.latencies)
+        print(f"{name}: {record.wins} wins, {record.draws} draws, "
+              f"{record.losses} losses, {record.errors} errors")
+        print(f"  moves: {record.optimal} optimal, "
+              f"{record.suboptimal} suboptimal")
+        if latency["count"]:
+            print(f"  latency: p50 {latency['p50'] * 1e3:.3f}ms, "
+                  f"p90 {latency['p90'] * 1e3:.3f}ms, "
+                  f"p99 {latency['p99'] * 1e3:.3f}ms, "
+                  f"max {latency['max'] * 1e3:.3f}ms")
+        rate = record.nodes_per_second()
+        if rate is not None:
+            print(f"  search: {record.nodes} nodes, {rate:,.0f} nodes/s")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Compare tic tac toe engines.")
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    perft_parser = commands.add_parser("perft", help="count positions by depth")
+    perft_parser.add_argument("engines", nargs="*", default=DEFAULT_ENGINES,
+                              help=f"any of {', '.join(ENGINES)}")
+    perft_parser.add_argument("--depth", type=int, default=9)
+
+    match_parser = commands.add_parser("match", help="play engines against "
+                                                     "each other")
+    match_parser.add_argument("first", choices=list(ENGINES))
+    match_parser.add_argument("second", choices=list(ENGINES))
+    match_parser.add_argument("--games", type=int, default=2)
+    match_parser.add_argument("--random-plies", type=int, default=0,
+                              help="random moves played before each game")
+    match_parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    if args.command == "perft":
+        unknown = [name for name in args.engines if name not in ENGINES]
+        if unknown:
+            parser.error(f"unknown engines: {', '.join(unknown)}")
+        run_perft(args.engines, args.depth)
+    else:
+        run_match(args.first, args.second, args.games, args.random_plies,
+                  args.seed)
+
+
+if __name__ == "__main__":
+    main()
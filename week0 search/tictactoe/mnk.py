@@ -0,0 +1,367 @@
+"""
+Tic Tac Toe Player for m,n,k games.
+
+Plays on a ROWS x COLUMNS board where the first player with K in a row
+wins, with the same interface as tictactoe.py. Call configure to change
+the game; the default is ordinary 3x3 tic tac toe.
+
+minimax runs an iterative deepening alpha-beta search for at most
+TIME_BUDGET seconds, scoring positions it cannot search to the end with
+a heuristic. Small boards are solved outright; on larger ones it
+returns the best move of the deepest search it completed.
+"""
+import math
+import time
+
+X = "X"
+O = "O"
+EMPTY = None
+
+ROWS = 3
+COLUMNS = 3
+K = 3
+
+# Seconds minimax may spend on one move
+TIME_BUDGET = 1.0
+
+# Boards with more cells than this only consider moves next to a stone
+LOCAL_MOVES_ABOVE = 16
+
+# Score of a won position, above any heuristic score. Wins with more
+# empty cells left score higher, so quicker wins are preferred.
+WIN = 1 << 40
+
+# Kinds of transposition table entries
+EXACT, LOWER, UPPER = 0, 1, 2
+
+# Maps positions, as (mover << SHIFT | other), to (depth, score, kind,
+# best move). Kept across deepening iterations and moves.
+table = {}
+
+# Positions visited and deepest completed search of the last minimax
+nodes = 0
+depth_reached = 0
+
+# perf_counter time at which the running search gives up
+deadline = math.inf
+
+# Set from another thread to make the running minimax give up as if its
+# time budget were spent. Not cleared by minimax, so a stop requested
+# just before a search starts still applies; callers clear it first.
+stopped = False
+
+# Score the player to move at the search root is known to reach some
+# other way, e.g. through a root move searched in parallel. Positions
+# with that player to move (empties % 2 == floor_parity) raise alpha to
+# it, the others lower beta to -floor. If poll_floor is set, it is called
+# every POLL_NODES nodes and may return a higher floor, narrowing the
+# windows of the searches already running.
+floor = -math.inf
+floor_parity = 0
+poll_floor = None
+
+# Nodes between checks of the deadline, stopped and poll_floor
+POLL_NODES = 1024
+
+
+class Timeout(Exception):
+    """
+    Raised inside the search once the time budget is spent.
+    """
+
+
+class Refuted(Exception):
+    """
+    Raised by a position whose window the floor has emptied before it
+    learned anything about its score, up to an ancestor that can cut off.
+    """
+
+
+def configure(rows=3, columns=3, k=3, time_budget=None):
+    """
+    Sets up a rows x columns game with k in a row to win, precomputing
+    the masks the search uses, and clears the transposition table.
+    Boards are stored one bit per cell, (i, j) being bit i * WIDTH + j,
+    with an always-empty padding column so that lines do not wrap.
+    """
+    global ROWS, COLUMNS, K, TIME_BUDGET, WIDTH, SHIFT, FULL, DIRECTIONS
+    global WINDOWS, WEIGHTS, ORDER
+
+    if not (1 <= k <= max(rows, columns)):
+        raise ValueError(f"cannot get {k} in a row on a {rows}x{columns} board")
+    ROWS, COLUMNS, K = rows, columns, k
+    if time_budget is not None:
+        TIME_BUDGET = time_budget
+    WIDTH = columns + 1
+    SHIFT = rows * WIDTH
+    FULL = sum(1 << (i * WIDTH + j) for i in range(rows) for j in range(columns))
+
+    # Bit offsets of a step right, down, down-right and down-left
+    DIRECTIONS = (1, WIDTH, WIDTH + 1, WIDTH - 1)
+
+    # Every run of k cells in a line, as a mask
+    WINDOWS = []
+    for i in range(rows):
+        for j in range(columns):
+            for di, dj in ((0, 1), (1, 0), (1, 1), (1, -1)):
+                cells = [(i + di * step, j + dj * step) for step in range(k)]
+                if all(0 <= a < rows and 0 <= b < columns for a, b in cells):
+                    WINDOWS.append(sum(1 << (a * WIDTH + b) for a, b in cells))
+
+    # Heuristic value of a window holding n stones of only one player
+    WEIGHTS = [0] + [4 ** (n - 1) for n in range(1, k + 1)]
+
+    # Cell bits from the center outwards, the order moves are tried in
+    center = ((rows - 1) / 2, (columns - 1) / 2)
+    cells = sorted(((i, j) for i in range(rows) for j in range(columns)),
+                   key=lambda cell: (abs(cell[0] - center[0])
+                                     + abs(cell[1] - center[1]), cell))
+    ORDER = [1 << (i * WIDTH + j) for i, j in cells]
+
+    table.clear()
+
+
+configure()
+
+
+def initial_state():
+    """
+    Returns starting state of the board.
+    """
+    return [[EMPTY] * COLUMNS for i in range(ROWS)]
+
+
+def encode(board):
+    """
+    Returns the (x, o) masks of a nested list board.
+    """
+    if len(board) != ROWS or any(len(row) != COLUMNS for row in board):
+        raise ValueError(f"board is not {ROWS}x{COLUMNS}")
+    x = o = 0
+    for i, row in enumerate(board):
+        for j, value in enumerate(row):
+            if value == X:
+                x |= 1 << (i * WIDTH + j)
+            elif value == O:
+                o |= 1 << (i * WIDTH + j)
+    return x, o
+
+
+def player(board):
+    """
+    Returns player who has the next turn on a board.
+    """
+    x, o = encode(board)
+    return X if bin(x).count("1") == bin(o).count("1") else O
+
+
+def actions(board):
+    """
+    Returns a list of all possible actions (i, j) available on the board.
+    """
+    return [(i, j) for i, row in enumerate(board)
+            for j, value in enumerate(row) if value == EMPTY]
+
+
+def result(board, action):
+    """
+    Returns the board that results from making move (i, j) on the board.
+    """
+    i, j = action
+    if not (0 <= i < ROWS and 0 <= j < COLUMNS) or board[i][j] != EMPTY:
+        raise ValueError(f"invalid action {action}")
+    board = [list(row) for row in board]
+    board[i][j] = player(board)
+    return board
+
+
+def has_line(mask):
+    """
+    Returns True if mask holds K cells in a row.
+    """
+    for step in DIRECTIONS:
+        run = mask
+        for _ in range(K - 1):
+            run &= run >> step
+        if run:
+            return True
+    return False
+
+
+def winner(board):
+    """
+    Returns the winner of the game, if there is one.
+    """
+    x, o = encode(board)
+    if has_line(x):
+        return X
+    if has_line(o):
+        return O
+    return None
+
+
+def terminal(board):
+    """
+    Returns True if game is over, False otherwise.
+    """
+    x, o = encode(board)
+    return has_line(x) or has_line(o) or x | o == FULL
+
+
+def utility(board):
+    """
+    Returns 1 if X has won the game, -1 if O has won, 0 otherwise.
+    """
+    check = winner(board)
+    if check:
+        return 1 if check == X else -1
+    return 0
+
+
+def minimax(board):
+    """
+    Returns the optimal action for the current player on the board, or
+    the best one found within TIME_BUDGET seconds.
+    """
+    global deadline, nodes, depth_reached
+
+    x, o = encode(board)
+    if has_line(x) or has_line(o) or x | o == FULL:
+        return None
+    if bin(x).count("1") == bin(o).count("1"):
+        mover, other = x, o
+    else:
+        mover, other = o, x
+    empties = bin(FULL & ~(x | o)).count("1")
+
+    deadline = time.perf_counter() + TIME_BUDGET
+    nodes = 0
+    depth_reached = 0
+    best = next(candidates(mover, other, None))
+    for depth in range(1, empties + 1):
+        try:
+            score = negamax(mover, other, empties, depth, -math.inf, math.inf)
+        except Timeout:
+            break
+        best = table[mover << SHIFT | other][3]
+        depth_reached = depth
+        if abs(score) >= WIN:
+            break
+    return divmod(best.bit_length() - 1, WIDTH)
+
+
+def negamax(mover, other, empties, depth, alpha, beta):
+    """
+    Returns the score of a position for the player to move, whose stones
+    are mover, searching depth moves ahead. Scores outside (alpha, beta)
+    are only bounds.
+    """
+    global nodes, floor
+
+    nodes += 1
+    if nodes % POLL_NODES == 0:
+        if stopped or time.perf_counter() > deadline:
+            raise Timeout()
+        if poll_floor is not None:
+            floor = max(floor, poll_floor())
+    if has_line(other):
+        return -(WIN + empties)
+    if empties == 0:
+        return 0
+    if depth == 0:
+        return evaluate(mover, other)
+
+    key = mover << SHIFT | other
+    entry = table.get(key)
+    hint = None
+    lower = -math.inf
+    if entry is not None:
+        entry_depth, score, kind, hint = entry
+        if entry_depth >= depth:
+            if kind == EXACT:
+                return score
+            if kind == LOWER:
+                alpha = max(alpha, score)
+                lower = score
+            else:
+                beta = min(beta, score)
+            if alpha >= beta:
+                return score
+
+    original_alpha = alpha
+    best_score = -math.inf
+    best_move = None
+    root_to_move = empties % 2 == floor_parity
+    moves = candidates(mover, other, hint)
+    move = next(moves, None)
+    while move is not None:
+        # Narrow the window to the floor, which may have risen. Scores at
+        # or below a raised alpha are only upper bounds.
+        if root_to_move:
+            if floor > alpha:
+                alpha = original_alpha = floor
+        elif -floor < beta:
+            beta = -floor
+        if alpha >= beta:
+            if best_score >= beta:
+                break
+            if lower >= beta:
+                return lower
+            raise Refuted()
+        try:
+            score = -negamax(other, mover | move, empties - 1, depth - 1,
+                             -beta, -alpha)
+        except Refuted:
+            # The floor has emptied this window too, unless it is retried
+            continue
+        if score > best_score:
+            best_score, best_move = score, move
+        alpha = max(alpha, score)
+        if alpha >= beta:
+            break
+        move = next(moves, None)
+
+    if best_score >= beta:
+        kind = LOWER
+    elif best_score <= original_alpha:
+        kind = UPPER
+    else:
+        kind = EXACT
+    table[key] = (depth, best_score, kind, best_move)
+    return best_score
+
+
+def candidates(mover, other, hint):
+    """
+    Yields the moves to try as cell bits: hint first, then empty cells
+    from the center outwards. On large boards only cells next to a stone
+    are tried, once there is one.
+    """
+    occupied = mover | other
+    empty = FULL & ~occupied
+    if occupied and ROWS * COLUMNS > LOCAL_MOVES_ABOVE:
+        near = occupied
+        for step in DIRECTIONS:
+            near |= occupied << step | occupied >> step
+        empty &= near
+    if hint is not None and empty & hint:
+        yield hint
+    for move in ORDER:
+        if empty & move and move != hint:
+            yield move
+
+
+def evaluate(mover, other):
+    """
+    Scores a position for the player to move by the runs of K cells that
+    only one player has stones in, weighting fuller runs more.
+    """
+    score = 0
+    for window in WINDOWS:
+        mine = window & mover
+        theirs = window & other
+        if mine and not theirs:
+            score += WEIGHTS[bin(mine).count("1")]
+        elif theirs and not mine:
+            score -= WEIGHTS[bin(theirs).count("1")]
+    return score
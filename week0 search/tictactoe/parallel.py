@@ -0,0 +1,199 @@
+"""
+Parallel root-split search for m,n,k games.
+
+The moves at the root of a fixed-depth mnk search are independent
+subtrees, so they are handed out to a pool of worker processes. The best
+score found so far is kept in shared memory: each root move is searched
+with it as alpha, so moves started after a good one has been found are
+cut off sooner. Running searches poll it as mnk's floor and narrow their
+windows when another worker raises it. With young brothers wait, the
+first move is searched on its own before the others are split, so they
+all start with its bound.
+
+Usage: python parallel.py [--workers N] [--young-brothers-wait]
+    Compares serial and parallel search times on a set of positions.
+"""
+import argparse
+import math
+import multiprocessing
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+import mnk
+
+# Benchmark positions: rows, columns, k, moves played so far and depth
+POSITIONS = [
+    (4, 4, 4, [], 9),
+    (5, 5, 4, [(2, 2)], 8),
+    (6, 6, 4, [(2, 2), (3, 3)], 7),
+    (7, 7, 5, [(3, 3), (3, 4), (4, 3)], 7),
+]
+
+# Best root score found so far, shared with the workers
+best_score = None
+
+
+def start_worker(shared, rows, columns, k):
+    """
+    Sets up a worker process for one root search.
+    """
+    global best_score
+
+    best_score = shared
+    mnk.configure(rows, columns, k)
+    mnk.deadline = math.inf
+    mnk.poll_floor = shared_floor
+
+
+def shared_floor():
+    return best_score.value
+
+
+def search_move(mover, other, empties, move, depth):
+    """
+    Searches one root move to depth, using the best root score so far as
+    alpha and raising it as the shared score rises, and publishes its
+    score if it beats it. Searches are not timed, so any deadline left by
+    an earlier mnk.minimax is cleared.
+
+    Returns (move, score, exact, nodes), where exact is False if the
+    score is at or below the best root score the search knew of, and so
+    only an upper bound.
+    """
+    mnk.deadline = math.inf
+    mnk.floor_parity = empties % 2
+    nodes = 0
+    while True:
+        alpha = mnk.floor = best_score.value
+        mnk.nodes = 0
+        try:
+            score = -mnk.negamax(other, mover | move, empties - 1, depth - 1,
+                                 -math.inf, -alpha)
+        except mnk.Refuted:
+            # Not expected at the root, but searching again is safe
+            nodes += mnk.nodes
+            continue
+        nodes += mnk.nodes
+        break
+    with best_score.get_lock():
+        if score > best_score.value:
+            best_score.value = score
+    return move, score, score > mnk.floor, nodes
+
+
+def root_position(board):
+    """
+    Returns (mover, other, empties) for a board in the current mnk game.
+    """
+    x, o = mnk.encode(board)
+    if bin(x).count("1") == bin(o).count("1"):
+        mover, other = x, o
+    else:
+        mover, other = o, x
+    empties = bin(mnk.FULL & ~(x | o)).count("1")
+    return mover, other, empties
+
+
+def serial_search(board, depth):
+    """
+    Searches every root move in turn to depth.
+
+    Returns (move, score, nodes).
+    """
+    mover, other, empties = root_position(board)
+    mnk.deadline = math.inf
+    best_move, best = None, -math.inf
+    nodes = 0
+    for move in mnk.candidates(mover, other, None):
+        mnk.nodes = 0
+        score = -mnk.negamax(other, mover | move, empties - 1, depth - 1,
+                             -math.inf, -best)
+        nodes += mnk.nodes
+        if score > best:
+            best_move, best = move, score
+    return to_action(best_move), best, nodes
+
+
+def parallel_search(board, depth, workers=None, young_brothers_wait=False):
+    """
+    Searches the root moves to depth in parallel over workers processes.
+
+    Returns (move, score, nodes), with the same move and score as
+    serial_search up to ties between equally good moves.
+    """
+    mover, other, empties = root_position(board)
+    mnk.deadline = math.inf
+    moves = list(mnk.candidates(mover, other, None))
+    shared = multiprocessing.get_context("fork").Value("d", -math.inf)
+
+    best_move, best = None, -math.inf
+    nodes = 0
+    if young_brothers_wait:
+        mnk.nodes = 0
+        best = -mnk.negamax(other, mover | moves[0], empties - 1, depth - 1,
+                            -math.inf, math.inf)
+        best_move, nodes = moves[0], mnk.nodes
+        shared.value = best
+        moves = moves[1:]
+
+    context = multiprocessing.get_context("fork")
+    with ProcessPoolExecutor(workers, mp_context=context,
+                             initializer=start_worker,
+                             initargs=(shared, mnk.ROWS, mnk.COLUMNS,
+                                       mnk.K)) as executor:
+        futures = [executor.submit(search_move, mover, other, empties, move,
+                                   depth)
+                   for move in moves]
+        for future in as_completed(futures):
+            move, score, exact, searched = future.result()
+            nodes += searched
+            if not exact:
+                continue
+            if score > best or (score == best and
+                                mnk.ORDER.index(move) < mnk.ORDER.index(best_move)):
+                best_move, best = move, score
+    return to_action(best_move), best, nodes
+
+
+def to_action(move):
+    return divmod(move.bit_length() - 1, mnk.WIDTH)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark parallel search.")
+    parser.add_argument("--workers", type=int, default=os.cpu_count())
+    parser.add_argument("--young-brothers-wait", action="store_true",
+                        help="search the first root move before splitting")
+    args = parser.parse_args()
+
+    print(f"{args.workers} workers")
+    total_serial = total_parallel = 0
+    for rows, columns, k, moves, depth in POSITIONS:
+        mnk.configure(rows, columns, k)
+        board = mnk.initial_state()
+        for move in moves:
+            board = mnk.result(board, move)
+
+        start = time.perf_counter()
+        serial = serial_search(board, depth)
+        serial_time = time.perf_counter() - start
+
+        mnk.configure(rows, columns, k)
+        start = time.perf_counter()
+        parallel = parallel_search(board, depth, args.workers,
+                                   args.young_brothers_wait)
+        parallel_time = time.perf_counter() - start
+
+        total_serial += serial_time
+        total_parallel += parallel_time
+        agree = "agree" if serial[1] == parallel[1] else "DISAGREE"
+        print(f"{rows}x{columns} k={k} depth {depth}: "
+              f"serial {serial_time:.2f}s {serial[2]} nodes, "
+              f"parallel {parallel_time:.2f}s {parallel[2]} nodes, "
+              f"speedup {serial_time / parallel_time:.2f}x, scores {agree}")
+    print(f"Total speedup {total_serial / total_parallel:.2f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -1,8 +1,28 @@
+import argparse
+import importlib
 import pygame
 import sys
+import threading
 import time
-
-import tictactoe as ttt
+from concurrent.futures import ThreadPoolExecutor
+
+parser = argparse.ArgumentParser(description="Play tic tac toe.")
+parser.add_argument("--engine", choices=["tictactoe", "bitboard", "mnk"],
+                    default="tictactoe", help="module that plays the AI")
+parser.add_argument("--size", type=int, nargs=2, metavar=("ROWS", "COLUMNS"),
+                    default=[3, 3], help="board size, with --engine mnk")
+parser.add_argument("--k", type=int, default=3,
+                    help="stones in a row to win, with --engine mnk")
+parser.add_argument("--budget", type=float, default=1.0,
+                    help="seconds per AI move, with --engine mnk")
+args = parser.parse_args()
+
+ttt = importlib.import_module(args.engine)
+if args.engine == "mnk":
+    ttt.configure(*args.size, args.k, args.budget)
+elif args.size != [3, 3] or args.k != 3:
+    parser.error("only --engine mnk plays other board sizes")
+rows, columns = args.size
 
 pygame.init()
 size = width, height = 600, 400
@@ -15,16 +35,58 @@ screen = pygame.display.set_mode(size)
 
 mediumFont = pygame.font.Font("OpenSans-Regular.ttf", 28)
 largeFont = pygame.font.Font("OpenSans-Regular.ttf", 40)
-moveFont = pygame.font.Font("OpenSans-Regular.ttf", 60)
+
+# Shrink tiles to fit larger boards
+tile_size = min(80, 300 // max(rows, columns))
+moveFont = pygame.font.Font("OpenSans-Regular.ttf", tile_size * 3 // 4)
 
 user = None
 board = ttt.initial_state()
-ai_turn = False
+
+# AI moves are computed on a worker thread so the window stays responsive.
+# ai_move is the Search of the pending move.
+executor = ThreadPoolExecutor(max_workers=1)
+lock = threading.Lock()
+ai_move = None
+
+
+class Search():
+    """
+    An AI move computed on the worker thread. Cancelling it stops the
+    search if the engine can stop early (mnk), so the worker is free for
+    the next one; the others search 3x3 boards in milliseconds anyway.
+    """
+
+    def __init__(self, board):
+        self.submitted = time.time()
+        self.started = None
+        self.cancelled = False
+        self.future = executor.submit(self.run, [row[:] for row in board])
+
+    def run(self, board):
+        with lock:
+            if self.cancelled:
+                return None
+            self.started = time.time()
+            if hasattr(ttt, "stopped"):
+                ttt.stopped = False
+        return ttt.minimax(board)
+
+    def cancel(self):
+        with lock:
+            self.cancelled = True
+            if self.started is not None and hasattr(ttt, "stopped"):
+                ttt.stopped = True
+        self.future.cancel()
+
 
 while True:
 
     for event in pygame.event.get():
         if event.type == pygame.QUIT:
+            if ai_move is not None:
+                ai_move.cancel()
+            executor.shutdown(wait=False, cancel_futures=True)
             sys.exit()
 
     screen.fill(black)
@@ -67,13 +129,12 @@ while True:
     else:
 
         # Draw game board
-        tile_size = 80
-        tile_origin = (width / 2 - (1.5 * tile_size),
-                       height / 2 - (1.5 * tile_size))
+        tile_origin = (width / 2 - (columns / 2 * tile_size),
+                       height / 2 - (rows / 2 * tile_size))
         tiles = []
-        for i in range(3):
+        for i in range(rows):
             row = []
-            for j in range(3):
+            for j in range(columns):
                 rect = pygame.Rect(
                     tile_origin[0] + j * tile_size,
                     tile_origin[1] + i * tile_size,
@@ -102,34 +163,39 @@ while True:
         elif user == player:
             title = f"Play as {user}"
         else:
-            title = f"Computer thinking..."
+            started = None if ai_move is None else ai_move.started
+            elapsed = 0 if started is None else time.time() - started
+            title = f"Computer thinking... {elapsed:.1f}s"
         title = largeFont.render(title, True, white)
         titleRect = title.get_rect()
         titleRect.center = ((width / 2), 30)
         screen.blit(title, titleRect)
 
-        # Check for AI move
+        # Start the AI move in the background, then poll for it. Moves
+        # are shown no sooner than half a second after starting.
         if user != player and not game_over:
-            if ai_turn:
-                time.sleep(0.5)
-                move = ttt.minimax(board)
-                board = ttt.result(board, move)
-                ai_turn = False
-            else:
-                ai_turn = True
+            if ai_move is None:
+                ai_move = Search(board)
+            elif (ai_move.future.done()
+                  and time.time() - ai_move.submitted >= 0.5):
+                board = ttt.result(board, ai_move.future.result())
+                ai_move = None
 
         # Check for a user move
         click, _, _ = pygame.mouse.get_pressed()
         if click == 1 and user == player and not game_over:
             mouse = pygame.mouse.get_pos()
-            for i in range(3):
-                for j in range(3):
+            for i in range(rows):
+                for j in range(columns):
                     if (board[i][j] == ttt.EMPTY and tiles[i][j].collidepoint(mouse)):
                         board = ttt.result(board, (i, j))
 
-        if game_over:
+        # Offer a new game once this one is over, or a reset while the
+        # computer is thinking, which drops its pending move
+        if game_over or ai_move is not None:
             againButton = pygame.Rect(width / 3, height - 65, width / 3, 50)
-            again = mediumFont.render("Play Again", True, black)
+            label = "Play Again" if game_over else "Reset"
+            again = mediumFont.render(label, True, black)
             againRect = again.get_rect()
             againRect.center = againButton.center
             pygame.draw.rect(screen, white, againButton)
@@ -139,8 +205,10 @@ while True:
                 mouse = pygame.mouse.get_pos()
                 if againButton.collidepoint(mouse):
                     time.sleep(0.2)
+                    if ai_move is not None:
+                        ai_move.cancel()
                     user = None
                     board = ttt.initial_state()
-                    ai_turn = False
+                    ai_move = None
 
     pygame.display.flip()
@@ -11,6 +11,9 @@ class Node():
 
 import math
 import copy
+
+import book
+
 X = "X"
 O = "O"
 EMPTY = None
@@ -105,19 +108,125 @@ def minimax(board):
     """
     Returns the optimal action for the current player on the board.
     """
+    if terminal(board):
+        return None
+    known = book.lookup(board)
+    if known is not None:
+        _, moves = known
+        return min(moves, key=MOVE_ORDER.index)
+    return alphabeta(board)
+
+
+def alphabeta(board):
+    """
+    Returns the optimal action for the current player on the board,
+    found by alpha-beta search.
+    """
+    global nodes
+
+    nodes = 0
+    killers.clear()
+    if terminal(board):
+        return None
+
+    best_move = None
+    if player(board) == X:
+        best = -math.inf
+        for move in ordered_actions(board, 0):
+            value = min_value(result(board, move), best, math.inf, 1)
+            if value > best:
+                best, best_move = value, move
+    else:
+        best = math.inf
+        for move in ordered_actions(board, 0):
+            value = max_value(result(board, move), -math.inf, best, 1)
+            if value < best:
+                best, best_move = value, move
+    return best_move
+
+
+# Number of positions visited by the last search
+nodes = 0
+
+# Moves in the order they are tried: center, corners, then edges
+MOVE_ORDER = [(1, 1), (0, 0), (0, 2), (2, 0), (2, 2),
+              (0, 1), (1, 0), (1, 2), (2, 1)]
+
+# Maps each depth to the last move that caused a cutoff there
+killers = {}
+
+
+def ordered_actions(board, depth):
+    """
+    Returns the actions on the board, trying the killer move for this
+    depth first and then the rest in MOVE_ORDER.
+    """
+    killer = killers.get(depth)
+    return sorted(actions(board),
+                  key=lambda move: (move != killer, MOVE_ORDER.index(move)))
+
+
+def max_value(board, alpha, beta, depth):
+    """
+    Returns the minimax value of a board with X to move, or a value
+    outside (alpha, beta) once it is known to lie outside.
+    """
+    global nodes
+
+    nodes += 1
+    if terminal(board):
+        return utility(board)
+    value = -math.inf
+    for move in ordered_actions(board, depth):
+        value = max(value, min_value(result(board, move), alpha, beta, depth + 1))
+        if value >= beta:
+            killers[depth] = move
+            return value
+        alpha = max(alpha, value)
+    return value
+
+
+def min_value(board, alpha, beta, depth):
+    """
+    Returns the minimax value of a board with O to move, or a value
+    outside (alpha, beta) once it is known to lie outside.
+    """
+    global nodes
+
+    nodes += 1
+    if terminal(board):
+        return utility(board)
+    value = math.inf
+    for move in ordered_actions(board, depth):
+        value = min(value, max_value(result(board, move), alpha, beta, depth + 1))
+        if value <= alpha:
+            killers[depth] = move
+            return value
+        beta = min(beta, value)
+    return value
+
+
+def enumerate_minimax(board):
+    """
+    The previous minimax: enumerates the whole game tree below each move
+    and picks the move with the best sum of terminal utilities. Kept to
+    compare against, counting positions visited in nodes.
+    """
+    global nodes
 
+    nodes = 0
     states = []
     moves = actions(board)
     scores = [0 for action in moves]
 
     for move1 in moves:
         new_board = result(board, move1)
+        nodes += 1
         if terminal(new_board):
-            print(utility(new_board))
             return move1
         else:
             states.append(Node(new_board, move1))
-        
+
     while states:
 
         node = states[-1]
@@ -127,36 +236,31 @@ def minimax(board):
 
             for move in poss_moves:
                 new_board = result(node.state, move)
+                nodes += 1
                 states.append(Node(new_board, node.parent))
-                
+
         else:
             for index, move in enumerate(moves):
                 if move == node.parent:
-                    
+
                     scores[index] += utility(node.state)
 
-    
     if player(board) == X:
         index_min = max(range(len(scores)), key=scores.__getitem__)
-        print(scores)
-        print(moves)
         return moves[index_min]
 
     else:
         index_max = min(range(len(scores)), key=scores.__getitem__)
-        print(scores)
-        print(moves)
         return moves[index_max]
 
 
+if __name__ == "__main__":
+    import time
 
-
-
-
-
-    
-
-
-
-
-
+    # Compare the searches and the book choosing the first move
+    for search in (minimax, alphabeta, enumerate_minimax):
+        nodes = 0
+        start = time.perf_counter()
+        move = search(initial_state())
+        elapsed = time.perf_counter() - start
+        print(f"{search.__name__}: {move}, {nodes} nodes, {elapsed:.3f}s")
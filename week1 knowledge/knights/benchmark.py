@@ -0,0 +1,102 @@
+"""Compares the truth table and SAT engines of model_check.
+
+Usage: python benchmark.py [--family knights|random|wide] [--max-symbols N]
+                           [--table-limit N] [--seed N]
+
+Knowledge bases grow in the number of symbols. The truth table engine is
+only run up to --table-limit symbols, since its time doubles with every
+symbol. The crossover is the size from which the SAT engine stays faster.
+"""
+import argparse
+import random
+import time
+
+from logic import *
+
+
+def knights(n, rng):
+    """Returns a ring of n islanders, each saying whether the next one is a
+    knight or a knave, and a query about the first."""
+    knight = [Symbol(f"{i} is a Knight") for i in range(n)]
+    knave = [Symbol(f"{i} is a Knave") for i in range(n)]
+    knowledge = And()
+    for i in range(n):
+        claim = knight[(i + 1) % n] if rng.random() < 0.5 else knave[(i + 1) % n]
+        knowledge.add(Or(knight[i], knave[i]))
+        knowledge.add(Not(And(knight[i], knave[i])))
+        knowledge.add(Implication(knight[i], claim))
+        knowledge.add(Implication(knave[i], Not(claim)))
+    return knowledge, knight[0]
+
+
+def random_cnf(n, rng, ratio=3.0):
+    """Returns a satisfiable-looking random 3-CNF over n symbols and a query."""
+    symbols = [Symbol(f"S{i}") for i in range(n)]
+    knowledge = And()
+    for _ in range(int(ratio * n)):
+        literals = [symbol if rng.random() < 0.5 else Not(symbol)
+                    for symbol in rng.sample(symbols, min(3, n))]
+        knowledge.add(Or(*literals))
+    return knowledge, rng.choice(symbols)
+
+
+def wide(n, rng, conjuncts=200):
+    """Returns many repeated clauses over n symbols, so that knowledge
+    bases of thousands of conjuncts are checked, and a query."""
+    knowledge, query = random_cnf(n, rng)
+    clauses = list(knowledge.conjuncts)
+    for _ in range(conjuncts * n):
+        knowledge.add(rng.choice(clauses))
+    return knowledge, query
+
+
+FAMILIES = {"knights": knights, "random": random_cnf, "wide": wide}
+
+
+def timed(knowledge, query, engine):
+    start = time.perf_counter()
+    entailed = model_check(knowledge, query, engine=engine)
+    return entailed, time.perf_counter() - start
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark model_check engines.")
+    parser.add_argument("--family", choices=list(FAMILIES), default="knights")
+    parser.add_argument("--max-symbols", type=int, default=400)
+    parser.add_argument("--table-limit", type=int, default=22)
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    rng = random.Random(args.seed)
+    build = FAMILIES[args.family]
+    crossover = None
+    print(f"{'symbols':>8} {'table':>10} {'sat':>10}")
+    n = 1
+    while True:
+        knowledge, query = build(n, rng)
+        symbols = len(set.union(knowledge.symbols(), query.symbols()))
+        if symbols > args.max_symbols:
+            break
+        entailed, sat_time = timed(knowledge, query, "sat")
+        if symbols <= args.table_limit:
+            expected, table_time = timed(knowledge, query, "table")
+            if expected != entailed:
+                raise Exception(f"engines disagree at {symbols} symbols")
+            if sat_time >= table_time:
+                crossover = None
+            elif crossover is None:
+                crossover = symbols
+            table = f"{table_time * 1e3:.2f}ms"
+        else:
+            table = "-"
+        print(f"{symbols:>8} {table:>10} {sat_time * 1e3:>8.2f}ms")
+        n = n + 1 if symbols < args.table_limit else n * 2
+
+    if crossover is None:
+        print("SAT was not faster at any size checked")
+    else:
+        print(f"SAT is faster from {crossover} symbols on")
+
+
+if __name__ == "__main__":
+    main()
@@ -1,7 +1,87 @@
-import itertools
+import copy
+import functools
+import weakref
+
+import sat
 
 
 class Sentence():
+    """Logical sentence.
+
+    Sentences are hash-consed: building a sentence equal to one that
+    already exists returns the existing node, so identical subformulas are
+    shared, and each node caches its hash and its symbols. And is not
+    shared, since add changes it in place, and neither are sentences with
+    an And inside. Those stay up to date with the And, recomputing their
+    hash and symbols once any And has changed.
+    """
+
+    __slots__ = ("hash_value", "names", "version", "__weakref__")
+
+    # Weak references to shared sentences, keyed by class and parts
+    interned = {}
+
+    # Number of times any And has been added to
+    changes = 0
+
+    @classmethod
+    def intern(cls, key, **fields):
+        """Returns the sentence of class cls with these fields and parts
+        key, reusing the shared one if it exists."""
+        # Sentences with an And inside can change, so they are not shared
+        shared = not any(isinstance(part, Sentence) and part.version is not None
+                         for part in key)
+        key = (cls, *key)
+        reference = Sentence.interned.get(key) if shared else None
+        sentence = None if reference is None else reference()
+        if sentence is None:
+            sentence = object.__new__(cls)
+            for name, value in fields.items():
+                setattr(sentence, name, value)
+            sentence.cache()
+            if shared:
+                Sentence.interned[key] = weakref.KeyedRef(sentence, forget, key)
+        return sentence
+
+    def parts(self):
+        """Returns the sentences this sentence is made of."""
+        return ()
+
+    def cache(self):
+        """Computes the hash and symbols of the sentence from its parts.
+        Sentences with an And inside record when, in version."""
+        parts = self.parts()
+        for part in parts:
+            part.refresh()
+        self.hash_value = hash((type(self).__name__,
+                                tuple(part.hash_value for part in parts)))
+        self.names = frozenset().union(*[part.names for part in parts])
+        if any(part.version is not None for part in parts):
+            self.version = Sentence.changes
+        else:
+            self.version = None
+
+    def refresh(self):
+        """Recomputes the cached hash and symbols if an And has changed
+        since they were computed."""
+        if self.version is not None and self.version != Sentence.changes:
+            self.cache()
+
+    def __hash__(self):
+        self.refresh()
+        return self.hash_value
+
+    def __reduce__(self):
+        return type(self), tuple(self.parts())
+
+    def __copy__(self):
+        return self
+
+    def __deepcopy__(self, memo):
+        if self.version is None:
+            return self
+        cls, parts = self.__reduce__()
+        return cls(*copy.deepcopy(parts, memo))
 
     def evaluate(self, model):
         """Evaluates the logical sentence."""
@@ -13,7 +93,14 @@ class Sentence():
 
     def symbols(self):
         """Returns a set of all symbols in the logical sentence."""
-        return set()
+        self.refresh()
+        return set(self.names)
+
+    def compile(self, symbols=None, bitwise=False):
+        """Returns the sentence compiled over an ordering of its symbols."""
+        if bitwise:
+            return BitsetSentence(self, symbols)
+        return CompiledSentence(self, symbols)
 
     @classmethod
     def validate(cls, sentence):
@@ -42,16 +129,30 @@ class Sentence():
             return f"({s})"
 
 
+def forget(reference):
+    """Removes a sentence that no longer exists from the interned table."""
+    if Sentence.interned.get(reference.key) is reference:
+        del Sentence.interned[reference.key]
+
+
 class Symbol(Sentence):
+    __slots__ = ("name",)
+
+    def __new__(cls, name):
+        return cls.intern((name,), name=name)
+
+    def cache(self):
+        self.hash_value = hash(("symbol", self.name))
+        self.names = frozenset([self.name])
+        self.version = None
 
-    def __init__(self, name):
-        self.name = name
+    def __reduce__(self):
+        return Symbol, (self.name,)
 
     def __eq__(self, other):
         return isinstance(other, Symbol) and self.name == other.name
 
-    def __hash__(self):
-        return hash(("symbol", self.name))
+    __hash__ = Sentence.__hash__
 
     def __repr__(self):
         return self.name
@@ -65,20 +166,22 @@ class Symbol(Sentence):
     def formula(self):
         return self.name
 
-    def symbols(self):
-        return {self.name}
-
 
 class Not(Sentence):
-    def __init__(self, operand):
+    __slots__ = ("operand",)
+
+    def __new__(cls, operand):
         Sentence.validate(operand)
-        self.operand = operand
+        return cls.intern((operand,), operand=operand)
+
+    def parts(self):
+        return (self.operand,)
 
     def __eq__(self, other):
-        return isinstance(other, Not) and self.operand == other.operand
+        return self is other or (isinstance(other, Not)
+                                 and self.operand == other.operand)
 
-    def __hash__(self):
-        return hash(("not", hash(self.operand)))
+    __hash__ = Sentence.__hash__
 
     def __repr__(self):
         return f"Not({self.operand})"
@@ -89,23 +192,31 @@ class Not(Sentence):
     def formula(self):
         return "¬" + Sentence.parenthesize(self.operand.formula())
 
-    def symbols(self):
-        return self.operand.symbols()
-
 
 class And(Sentence):
+    __slots__ = ("conjuncts",)
+
     def __init__(self, *conjuncts):
         for conjunct in conjuncts:
             Sentence.validate(conjunct)
         self.conjuncts = list(conjuncts)
+        self.cache()
+
+    def parts(self):
+        return self.conjuncts
+
+    def cache(self):
+        Sentence.cache(self)
+        self.version = Sentence.changes
 
     def __eq__(self, other):
-        return isinstance(other, And) and self.conjuncts == other.conjuncts
+        return self is other or (isinstance(other, And)
+                                 and self.conjuncts == other.conjuncts)
 
-    def __hash__(self):
-        return hash(
-            ("and", tuple(hash(conjunct) for conjunct in self.conjuncts))
-        )
+    __hash__ = Sentence.__hash__
+
+    def __copy__(self):
+        return And(*self.conjuncts)
 
     def __repr__(self):
         conjunctions = ", ".join(
@@ -116,6 +227,7 @@ class And(Sentence):
     def add(self, conjunct):
         Sentence.validate(conjunct)
         self.conjuncts.append(conjunct)
+        Sentence.changes += 1
 
     def evaluate(self, model):
         return all(conjunct.evaluate(model) for conjunct in self.conjuncts)
@@ -126,23 +238,23 @@ class And(Sentence):
         return " ∧ ".join([Sentence.parenthesize(conjunct.formula())
                            for conjunct in self.conjuncts])
 
-    def symbols(self):
-        return set.union(*[conjunct.symbols() for conjunct in self.conjuncts])
-
 
 class Or(Sentence):
-    def __init__(self, *disjuncts):
+    __slots__ = ("disjuncts",)
+
+    def __new__(cls, *disjuncts):
         for disjunct in disjuncts:
             Sentence.validate(disjunct)
-        self.disjuncts = list(disjuncts)
+        return cls.intern(disjuncts, disjuncts=list(disjuncts))
+
+    def parts(self):
+        return self.disjuncts
 
     def __eq__(self, other):
-        return isinstance(other, Or) and self.disjuncts == other.disjuncts
+        return self is other or (isinstance(other, Or)
+                                 and self.disjuncts == other.disjuncts)
 
-    def __hash__(self):
-        return hash(
-            ("or", tuple(hash(disjunct) for disjunct in self.disjuncts))
-        )
+    __hash__ = Sentence.__hash__
 
     def __repr__(self):
         disjuncts = ", ".join([str(disjunct) for disjunct in self.disjuncts])
@@ -157,24 +269,25 @@ class Or(Sentence):
         return " ∨  ".join([Sentence.parenthesize(disjunct.formula())
                             for disjunct in self.disjuncts])
 
-    def symbols(self):
-        return set.union(*[disjunct.symbols() for disjunct in self.disjuncts])
-
 
 class Implication(Sentence):
-    def __init__(self, antecedent, consequent):
+    __slots__ = ("antecedent", "consequent")
+
+    def __new__(cls, antecedent, consequent):
         Sentence.validate(antecedent)
         Sentence.validate(consequent)
-        self.antecedent = antecedent
-        self.consequent = consequent
+        return cls.intern((antecedent, consequent),
+                          antecedent=antecedent, consequent=consequent)
+
+    def parts(self):
+        return (self.antecedent, self.consequent)
 
     def __eq__(self, other):
-        return (isinstance(other, Implication)
-                and self.antecedent == other.antecedent
-                and self.consequent == other.consequent)
+        return self is other or (isinstance(other, Implication)
+                                 and self.antecedent == other.antecedent
+                                 and self.consequent == other.consequent)
 
-    def __hash__(self):
-        return hash(("implies", hash(self.antecedent), hash(self.consequent)))
+    __hash__ = Sentence.__hash__
 
     def __repr__(self):
         return f"Implication({self.antecedent}, {self.consequent})"
@@ -188,24 +301,24 @@ class Implication(Sentence):
         consequent = Sentence.parenthesize(self.consequent.formula())
         return f"{antecedent} => {consequent}"
 
-    def symbols(self):
-        return set.union(self.antecedent.symbols(), self.consequent.symbols())
-
 
 class Biconditional(Sentence):
-    def __init__(self, left, right):
+    __slots__ = ("left", "right")
+
+    def __new__(cls, left, right):
         Sentence.validate(left)
         Sentence.validate(right)
-        self.left = left
-        self.right = right
+        return cls.intern((left, right), left=left, right=right)
+
+    def parts(self):
+        return (self.left, self.right)
 
     def __eq__(self, other):
-        return (isinstance(other, Biconditional)
-                and self.left == other.left
-                and self.right == other.right)
+        return self is other or (isinstance(other, Biconditional)
+                                 and self.left == other.left
+                                 and self.right == other.right)
 
-    def __hash__(self):
-        return hash(("biconditional", hash(self.left), hash(self.right)))
+    __hash__ = Sentence.__hash__
 
     def __repr__(self):
         return f"Biconditional({self.left}, {self.right})"
@@ -221,43 +334,330 @@ class Biconditional(Sentence):
         right = Sentence.parenthesize(str(self.right))
         return f"{left} <=> {right}"
 
-    def symbols(self):
-        return set.union(self.left.symbols(), self.right.symbols())
 
+class CompiledSentence():
+    """Sentence compiled to straight-line code over symbol indices."""
+
+    HEADER = "def evaluate(v):"
+
+    # Python expression computing each kind of node from its operands
+    TEMPLATES = {
+        "not": lambda operands: f"not {operands[0]}",
+        "and": lambda operands: " and ".join(operands) or "True",
+        "or": lambda operands: " or ".join(operands) or "False",
+        "implies": lambda operands: f"not {operands[0]} or {operands[1]}",
+        "biconditional": lambda operands: f"{operands[0]} == {operands[1]}",
+    }
+
+    # Augmented assignments that fold long operand lists in chunks, for
+    # kinds whose expressions Python nests one level per operand
+    AUGMENTED = {}
+
+    # Operands per line when folding
+    CHAIN = 64
+
+    def __init__(self, sentence, symbols=None):
+        if symbols is None:
+            symbols = sorted(sentence.symbols())
+        self.symbols = list(symbols)
+        self.index = {name: i for i, name in enumerate(self.symbols)}
+        self.source = self.generate(sentence)
+        self.function = build(self.source)
+
+    def generate(self, sentence):
+        """Returns source code of a function evaluating the sentence."""
+        lines = [self.HEADER]
+        temporaries = {}
+
+        # Visit nodes in postorder, computing shared subtrees once
+        stack = [(sentence, False)]
+        while stack:
+            node, expanded = stack.pop()
+            if id(node) in temporaries:
+                continue
+            kind, operands = decompose(node)
+            if not expanded and kind != "symbol":
+                stack.append((node, True))
+                stack.extend((operand, False) for operand in reversed(operands))
+                continue
+
+            temporary = f"t{len(temporaries)}"
+            if kind == "symbol":
+                if node.name not in self.index:
+                    raise Exception(f"variable {node.name} not in symbols")
+                lines.append(f"    {temporary} = v[{self.index[node.name]}]")
+            else:
+                inputs = [temporaries[id(operand)] for operand in operands]
+                template = self.TEMPLATES[kind]
+                if kind in self.AUGMENTED and len(inputs) > self.CHAIN:
+                    lines.append(f"    {temporary} = "
+                                 f"{template(inputs[:self.CHAIN])}")
+                    for start in range(self.CHAIN, len(inputs), self.CHAIN):
+                        chunk = inputs[start:start + self.CHAIN]
+                        lines.append(f"    {temporary} {self.AUGMENTED[kind]} "
+                                     f"{template(chunk)}")
+                else:
+                    lines.append(f"    {temporary} = {template(inputs)}")
+            temporaries[id(node)] = temporary
+
+        lines.append(f"    return {temporaries[id(sentence)]}")
+        return "\n".join(lines) + "\n"
+
+    def __call__(self, values):
+        """Evaluates the sentence given a sequence of bools in symbol order."""
+        return self.function(values)
+
+    def evaluate(self, model):
+        """Evaluates the sentence in a model mapping symbol names to values."""
+        try:
+            return self.function([bool(model[name]) for name in self.symbols])
+        except KeyError as e:
+            raise Exception(f"variable {e.args[0]} not in model")
 
-def model_check(knowledge, query):
-    """Checks if knowledge base entails query."""
 
-    def check_all(knowledge, query, symbols, model):
-        """Checks if knowledge base entails query, given a particular model."""
+class BitsetSentence(CompiledSentence):
+    """Sentence compiled to bitwise operations on sets of models.
 
-        # If model has an assignment for each symbol
-        if not symbols:
+    Bit j of each value stands for one model, so a single call evaluates
+    the sentence in every model of a chunk: v[i] holds the models in which
+    symbol i is true and m holds every model of the chunk.
+    """
 
-            # If knowledge base is true in model, then query must also be true
-            if knowledge.evaluate(model):
-                return query.evaluate(model)
-            return True
-        else:
+    HEADER = "def evaluate(v, m):"
+
+    TEMPLATES = {
+        "not": lambda operands: f"m ^ {operands[0]}",
+        "and": lambda operands: " & ".join(operands) or "m",
+        "or": lambda operands: " | ".join(operands) or "0",
+        "implies": lambda operands: f"(m ^ {operands[0]}) | {operands[1]}",
+        "biconditional": lambda operands: f"m ^ ({operands[0]} ^ {operands[1]})",
+    }
 
-            # Choose one of the remaining unused symbols
-            remaining = symbols.copy()
-            p = remaining.pop()
+    AUGMENTED = {"and": "&=", "or": "|="}
 
-            # Create a model where the symbol is true
-            model_true = model.copy()
-            model_true[p] = True
+    # Each chunk holds 2 ** CHUNK_BITS models
+    CHUNK_BITS = 16
 
-            # Create a model where the symbol is false
-            model_false = model.copy()
-            model_false[p] = False
+    def __call__(self, values, mask):
+        """Evaluates the sentence given bitsets of models in symbol order."""
+        return self.function(values, mask)
 
-            # Ensure entailment holds in both models
-            return (check_all(knowledge, query, remaining, model_true) and
-                    check_all(knowledge, query, remaining, model_false))
+    def evaluate(self, model):
+        """Evaluates the sentence in a model mapping symbol names to values."""
+        try:
+            return bool(self.function([int(bool(model[name]))
+                                       for name in self.symbols], 1))
+        except KeyError as e:
+            raise Exception(f"variable {e.args[0]} not in model")
+
+    def find_model(self):
+        """Returns a model in which the sentence is true, or None."""
+        n = len(self.symbols)
+        inner = min(n, self.CHUNK_BITS)
+        size = 1 << inner
+        mask = (1 << size) - 1
+
+        # Models in a chunk differ in the first inner symbols: symbol i is
+        # true in alternating runs of 2 ** i models
+        patterns = []
+        for i in range(inner):
+            run = 1 << i
+            block = ((1 << run) - 1) << run
+            patterns.append(block * (mask // ((1 << 2 * run) - 1)))
+
+        # The remaining symbols are the same throughout a chunk
+        for chunk in range(1 << (n - inner)):
+            values = patterns + [mask if chunk >> i & 1 else 0
+                                 for i in range(n - inner)]
+            satisfied = self.function(values, mask)
+            if satisfied:
+                j = (satisfied & -satisfied).bit_length() - 1
+                index = chunk << inner | j
+                return {name: bool(index >> i & 1)
+                        for i, name in enumerate(self.symbols)}
+        return None
+
+
+@functools.lru_cache(maxsize=256)
+def build(source):
+    """Returns the evaluate function defined by generated source code."""
+    namespace = {}
+    exec(source, namespace)
+    return namespace["evaluate"]
+
+
+def decompose(sentence):
+    """Returns the kind of a sentence and the list of its operands."""
+    if isinstance(sentence, Symbol):
+        return "symbol", []
+    if isinstance(sentence, Not):
+        return "not", [sentence.operand]
+    if isinstance(sentence, And):
+        return "and", sentence.conjuncts
+    if isinstance(sentence, Or):
+        return "or", sentence.disjuncts
+    if isinstance(sentence, Implication):
+        return "implies", [sentence.antecedent, sentence.consequent]
+    if isinstance(sentence, Biconditional):
+        return "biconditional", [sentence.left, sentence.right]
+    raise TypeError(f"cannot compile {type(sentence).__name__}")
+
+
+class Tseitin():
+    """Tseitin encoding of sentences into clauses over integer literals."""
+
+    def __init__(self):
+        self.variables = {}
+        self.count = 0
+        self.clauses = []
+
+        # Literal of each node encoded so far, keyed by id, with the node
+        # kept alive so that its id is not reused. Nodes with an And inside
+        # can change, so they are only kept for the call encoding them.
+        self.literals = {}
+
+    def variable(self, name):
+        """Returns the variable of a symbol, numbering new symbols from 1."""
+        if name not in self.variables:
+            self.count += 1
+            self.variables[name] = self.count
+        return self.variables[name]
+
+    def literal(self, sentence):
+        """Returns a literal equivalent to the sentence, adding clauses that
+        define the variables introduced for its subtrees."""
+        current = {}
+
+        def known(node):
+            return self.literals if node.version is None else current
+
+        stack = [(sentence, False)]
+        while stack:
+            node, expanded = stack.pop()
+            if id(node) in known(node):
+                continue
+            kind, operands = decompose(node)
+            if not expanded and kind != "symbol":
+                stack.append((node, True))
+                stack.extend((operand, False) for operand in reversed(operands))
+                continue
+
+            inputs = [known(operand)[id(operand)][1] for operand in operands]
+            if kind == "symbol":
+                literal = self.variable(node.name)
+            elif kind == "not":
+                literal = -inputs[0]
+            elif kind == "implies":
+                literal = self.define("or", [-inputs[0], inputs[1]])
+            else:
+                literal = self.define(kind, inputs)
+            known(node)[id(node)] = (node, literal)
+        return known(sentence)[id(sentence)][1]
+
+    def define(self, kind, inputs):
+        """Returns a new variable x, adding clauses for x <-> kind(inputs)."""
+        self.count += 1
+        x = self.count
+        if kind == "and":
+            self.clauses.extend([-x, a] for a in inputs)
+            self.clauses.append([x] + [-a for a in inputs])
+        elif kind == "or":
+            self.clauses.extend([x, -a] for a in inputs)
+            self.clauses.append([-x] + inputs)
+        else:
+            a, b = inputs
+            self.clauses.extend([[-x, -a, b], [-x, a, -b], [x, a, b], [x, -a, -b]])
+        return x
+
+    def add(self, sentence):
+        """Adds clauses that hold exactly when the sentence is true."""
+        stack = [sentence]
+        while stack:
+            node = stack.pop()
+            if isinstance(node, And):
+                stack.extend(node.conjuncts)
+            elif isinstance(node, Or):
+                self.clauses.append([self.literal(disjunct)
+                                     for disjunct in node.disjuncts])
+            else:
+                self.clauses.append([self.literal(node)])
+
+
+class KnowledgeBase():
+    """Knowledge base answering many entailment queries incrementally.
+
+    Sentences are kept in CNF in one SAT solver, so clauses it learns while
+    answering one query help with the next.
+    """
+
+    def __init__(self, *sentences):
+        self.sentences = []
+        self.encoding = Tseitin()
+        self.solver = sat.Solver()
+        self.added = 0
+        for sentence in sentences:
+            self.add(sentence)
+
+    def add(self, sentence):
+        """Adds a sentence to the knowledge base."""
+        Sentence.validate(sentence)
+        self.sentences.append(sentence)
+        self.encoding.add(sentence)
+
+    def literal(self, query):
+        """Returns the literal of a query, passing new clauses to the solver."""
+        Sentence.validate(query)
+        literal = self.encoding.literal(query)
+        for clause in self.encoding.clauses[self.added:]:
+            self.solver.add_clause(clause)
+        self.added = len(self.encoding.clauses)
+        return literal
+
+    def entails(self, query):
+        """Checks if the knowledge base entails query."""
+        literal = self.literal(query)
+        return not self.solver.solve([-literal])
+
+    def entailed(self, queries):
+        """Returns the queries that the knowledge base entails, in order.
+
+        Any model of the knowledge base rules out every query false in it,
+        so each remaining query needs at most one more search.
+        """
+        literals = [self.literal(query) for query in queries]
+        candidates = set(literals)
+        if self.solver.solve():
+            candidates = self.true_in_model(candidates)
+        for literal in literals:
+            if literal in candidates and self.solver.solve([-literal]):
+                candidates = self.true_in_model(candidates)
+        return [query for query, literal in zip(queries, literals)
+                if literal in candidates]
+
+    def true_in_model(self, literals):
+        """Returns the literals true in the solver's last model."""
+        model = self.solver.model
+        return {literal for literal in literals
+                if model.get(abs(literal), False) == (literal > 0)}
+
+
+def model_check(knowledge, query, engine="table"):
+    """Checks if knowledge base entails query.
+
+    The table engine evaluates every model; the sat engine searches for a
+    model of knowledge and not query with a SAT solver instead.
+    """
+    if engine == "sat":
+        encoding = Tseitin()
+        encoding.add(knowledge)
+        encoding.add(Not(query))
+        return not sat.Solver(encoding.clauses).solve()
+    if engine != "table":
+        raise ValueError(f"unknown engine {engine}")
 
     # Get all symbols in both knowledge and query
-    symbols = set.union(knowledge.symbols(), query.symbols())
+    symbols = sorted(set.union(knowledge.symbols(), query.symbols()))
 
-    # Check that knowledge entails query
-    return check_all(knowledge, query, symbols, dict())
+    # Knowledge entails query if no model makes knowledge true and query false
+    counterexample = And(knowledge, Not(query)).compile(symbols, bitwise=True)
+    return counterexample.find_model() is None
@@ -0,0 +1,311 @@
+"""CDCL SAT solver over clauses of integer literals.
+
+Variables are positive integers and the literal -v is the negation of v,
+as in the DIMACS format. The solver propagates units with two watched
+literals per clause, learns a first-UIP clause from every conflict,
+picks variables by activity (VSIDS) with saved phases, and restarts on
+the Luby sequence, dropping the longer half of its learned clauses once
+there are too many.
+"""
+import heapq
+
+# Conflicts between restarts are this many times the Luby sequence
+RESTART_BASE = 100
+
+# Activities are divided by this after every conflict
+ACTIVITY_DECAY = 0.95
+
+# Learned clauses kept before the first cleanup, and the factor by which
+# the limit grows at each cleanup
+LEARNED_LIMIT = 2000
+LEARNED_GROWTH = 1.1
+
+
+def luby(i):
+    """Returns term i, counting from 0, of the Luby sequence 1, 1, 2, 1, 1,
+    2, 4, ..."""
+    size, power = 1, 0
+    while size < i + 1:
+        power += 1
+        size = 2 * size + 1
+    while size - 1 != i:
+        size = (size - 1) >> 1
+        power -= 1
+        i %= size
+    return 1 << power
+
+
+class Solver():
+    """Incremental SAT solver; clauses may be added between calls to solve."""
+
+    def __init__(self, clauses=()):
+        self.ok = True
+        self.variables = 0
+
+        # Maps every literal to 1 if it is true, -1 if false, 0 if unassigned
+        self.value = {}
+        self.level = [0]
+        self.reason = [None]
+        self.phase = [False]
+        self.activity = [0.0]
+        self.increment = 1.0
+        self.heap = []
+        self.clauses = []
+        self.originals = 0
+        self.learned_limit = LEARNED_LIMIT
+        self.watches = {}
+        self.trail = []
+        self.limits = []
+        self.head = 0
+        self.model = None
+        self.conflicts = 0
+        self.decisions = 0
+        self.propagations = 0
+        for clause in clauses:
+            self.add_clause(clause)
+
+    def grow(self, variables):
+        """Makes room for variables numbered up to variables."""
+        for var in range(self.variables + 1, variables + 1):
+            self.value[var] = self.value[-var] = 0
+            self.level.append(0)
+            self.reason.append(None)
+            self.phase.append(False)
+            self.activity.append(0.0)
+            self.watches[var] = []
+            self.watches[-var] = []
+            heapq.heappush(self.heap, (0.0, var))
+        self.variables = max(self.variables, variables)
+
+    def add_clause(self, clause):
+        """Adds a clause, returning False if the clauses are now unsatisfiable."""
+        if not self.ok:
+            return False
+        self.backtrack(0)
+        self.grow(max((abs(literal) for literal in clause), default=0))
+
+        # Drop duplicate and false literals, and clauses that are already true
+        literals = []
+        for literal in dict.fromkeys(clause):
+            value = self.value[literal]
+            if value == 1 or -literal in literals:
+                return True
+            if value == 0:
+                literals.append(literal)
+
+        if not literals:
+            self.ok = False
+        elif len(literals) == 1:
+            self.assign(literals[0], None)
+            self.ok = self.propagate() is None
+        else:
+            self.attach(literals)
+            self.originals = len(self.clauses)
+        return self.ok
+
+    def attach(self, literals):
+        """Stores a clause, watching its first two literals."""
+        index = len(self.clauses)
+        self.clauses.append(literals)
+        self.watches[literals[0]].append(index)
+        self.watches[literals[1]].append(index)
+        return index
+
+    def assign(self, literal, reason):
+        var = abs(literal)
+        self.value[literal] = 1
+        self.value[-literal] = -1
+        self.level[var] = len(self.limits)
+        self.reason[var] = reason
+        self.trail.append(literal)
+
+    def propagate(self):
+        """Assigns every literal implied by unit clauses, returning the index
+        of a clause left false, or None."""
+        value, watches, clauses = self.value, self.watches, self.clauses
+        trail = self.trail
+        while self.head < len(trail):
+            false = -trail[self.head]
+            self.head += 1
+            self.propagations += 1
+            watchers = watches[false]
+            watches[false] = kept = []
+            for position, index in enumerate(watchers):
+                clause = clauses[index]
+                if clause[0] == false:
+                    clause[0], clause[1] = clause[1], false
+                first = clause[0]
+                first_value = value[first]
+                if first_value == 1:
+                    kept.append(index)
+                    continue
+
+                # Look for a literal that is not false to watch instead
+                for k in range(2, len(clause)):
+                    literal = clause[k]
+                    if value[literal] != -1:
+                        clause[1], clause[k] = literal, false
+                        watches[literal].append(index)
+                        break
+                else:
+                    kept.append(index)
+                    if first_value == -1:
+                        kept.extend(watchers[position + 1:])
+                        return index
+                    self.assign(first, index)
+        return None
+
+    def analyze(self, conflict):
+        """Returns the first-UIP clause learned from a conflict, asserting
+        literal first, and the level to jump back to."""
+        level, reason, trail = self.level, self.reason, self.trail
+        current = len(self.limits)
+        learned = [None]
+        seen = set()
+        pending = 0
+        clause = self.clauses[conflict]
+        index = len(trail) - 1
+        while True:
+            for literal in clause:
+                var = abs(literal)
+                if var in seen or level[var] == 0:
+                    continue
+                seen.add(var)
+                self.bump(var)
+                if level[var] == current:
+                    pending += 1
+                else:
+                    learned.append(literal)
+
+            # Resolve on the latest literal of the conflict on the trail
+            while abs(trail[index]) not in seen:
+                index -= 1
+            literal = trail[index]
+            index -= 1
+            pending -= 1
+            if pending == 0:
+                break
+            clause = self.clauses[reason[abs(literal)]][1:]
+        learned[0] = -literal
+
+        # Drop literals implied false by the other literals of the clause
+        learned[1:] = [literal for literal in learned[1:]
+                       if reason[abs(literal)] is None
+                       or not all(abs(other) in seen or level[abs(other)] == 0
+                                  for other in self.clauses[reason[abs(literal)]][1:])]
+
+        if len(learned) == 1:
+            return learned, 0
+        deepest = max(range(1, len(learned)), key=lambda k: level[abs(learned[k])])
+        learned[1], learned[deepest] = learned[deepest], learned[1]
+        return learned, level[abs(learned[1])]
+
+    def bump(self, var):
+        self.activity[var] += self.increment
+        if self.activity[var] > 1e100:
+            self.activity = [activity * 1e-100 for activity in self.activity]
+            self.increment *= 1e-100
+            self.heap = [(-self.activity[v], v) for v in range(1, self.variables + 1)
+                         if self.value[v] == 0]
+            heapq.heapify(self.heap)
+        elif self.value[var] == 0:
+            heapq.heappush(self.heap, (-self.activity[var], var))
+
+    def backtrack(self, level):
+        """Undoes every assignment made above decision level."""
+        if len(self.limits) <= level:
+            return
+        start = self.limits[level]
+        for literal in self.trail[start:]:
+            var = abs(literal)
+            self.value[literal] = self.value[-literal] = 0
+            self.reason[var] = None
+            self.phase[var] = literal > 0
+            heapq.heappush(self.heap, (-self.activity[var], var))
+        del self.trail[start:]
+        del self.limits[level:]
+        self.head = start
+
+    def reduce(self):
+        """Drops the longer half of the learned clauses, at decision level 0."""
+        learned = sorted(self.clauses[self.originals:], key=len)
+        del self.clauses[self.originals:]
+        self.clauses.extend(learned[:len(learned) // 2])
+        for literal in self.watches:
+            self.watches[literal] = []
+        for index, clause in enumerate(self.clauses):
+            self.watches[clause[0]].append(index)
+            self.watches[clause[1]].append(index)
+
+        # Reasons at level 0 are never looked at, and indices have changed
+        for literal in self.trail:
+            self.reason[abs(literal)] = None
+        self.learned_limit *= LEARNED_GROWTH
+
+    def pick(self):
+        """Returns the unassigned variable of highest activity, or None."""
+        while self.heap:
+            negative, var = heapq.heappop(self.heap)
+            if self.value[var] == 0 and -negative == self.activity[var]:
+                return var
+        return None
+
+    def solve(self, assumptions=()):
+        """Returns True if the clauses are satisfiable with every assumed
+        literal true, storing a satisfying assignment in model."""
+        self.model = None
+        if not self.ok:
+            return False
+        self.grow(max((abs(literal) for literal in assumptions), default=0))
+        restarts = 0
+        budget = RESTART_BASE * luby(0)
+        try:
+            while True:
+                conflict = self.propagate()
+                if conflict is not None:
+                    self.conflicts += 1
+                    budget -= 1
+                    if not self.limits:
+                        self.ok = False
+                        return False
+                    learned, level = self.analyze(conflict)
+                    self.backtrack(level)
+                    if len(learned) == 1:
+                        self.assign(learned[0], None)
+                    else:
+                        self.assign(learned[0], self.attach(learned))
+                    self.increment /= ACTIVITY_DECAY
+                    continue
+
+                if budget <= 0:
+                    restarts += 1
+                    budget = RESTART_BASE * luby(restarts)
+                    self.backtrack(0)
+                    if len(self.clauses) - self.originals > self.learned_limit:
+                        self.reduce()
+                    continue
+
+                # Assumptions are the first decisions, one per level
+                literal = None
+                while len(self.limits) < len(assumptions):
+                    assumed = assumptions[len(self.limits)]
+                    value = self.value[assumed]
+                    if value == -1:
+                        return False
+                    self.limits.append(len(self.trail))
+                    if value == 0:
+                        literal = assumed
+                        break
+
+                if literal is None:
+                    var = self.pick()
+                    if var is None:
+                        self.model = {v: self.value[v] == 1
+                                      for v in range(1, self.variables + 1)}
+                        return True
+                    literal = var if self.phase[var] else -var
+                    self.limits.append(len(self.trail))
+                self.decisions += 1
+                self.assign(literal, None)
+        finally:
+            self.backtrack(0)